@@ -3,20 +3,40 @@ import os
 import sys
 import signal
 import time
-from collections import deque
 
 import cv2
-import mediapipe as mp
-import pyautogui
+
+from cursor_actuator import CursorActuator
+from cursor_filter import make_filter
+from frame_bus import open_capture, read_mirrored
+from frame_governor import FrameGovernor
+from gaze_calibration import GAZE_PROFILE, calibrated_profile, load_mapper
+from gesture_engine import EYE_FEATURES, GestureEngine, eye_gestures
+from landmark_features import EYELID_LOWER, EYELID_UPPER
+from landmark_stream import LandmarkRecorder
+from tracker_profiles import apply_threads, face_pointer_index, get_profile, inference_input, make_face_mesh
+from tracker_steps import EyeStep
 
 # ========= Settings (tweak here) =========
 CAM_INDEX = int(os.getenv("CAM_INDEX", "0"))
+FRAME_BUS = os.getenv("FRAME_BUS", "")   # read frames from `python frame_bus.py publish` instead
 SHOW_WINDOW = os.getenv("SHOW_WINDOW", "1") == "1"
 DRAW_DEBUG = True
 
-# Cursor smoothing (0..1)
+# MediaPipe performance profile: lite | balanced | accurate (see tracker_profiles.py)
+TRACKER_PROFILE = os.getenv("TRACKER_PROFILE", "balanced")
+
+# Cursor filter: one_euro | kalman | lerp (lerp uses SMOOTHING 0..1)
+CURSOR_FILTER = os.getenv("CURSOR_FILTER", "one_euro")
 SMOOTHING = float(os.getenv("SMOOTHING", "0.25"))
 
+# Per-user gaze calibration (`python gaze_calibration.py calibrate`); GAZE_PROFILE names it,
+# falling back to "default"; without either the pointer landmark maps straight to the screen
+GAZE_CALIBRATION = os.getenv("GAZE_CALIBRATION", "1") == "1"
+
+# Record landmarks to a JSON-lines stream for replay/benchmarks (empty = off)
+RECORD_LANDMARKS = os.getenv("RECORD_LANDMARKS", "")
+
 # --- Dwell Click ---
 DWELL_ENABLED = os.getenv("DWELL_ENABLED", "1") == "1"
 DWELL_TIME_S = float(os.getenv("DWELL_TIME_S", "1.0"))     # seconds to click
@@ -31,13 +51,10 @@ CLICK_COOLDOWN = float(os.getenv("CLICK_COOLDOWN", "0.25"))
 # --- Edge scroll ---
 EDGE_SCROLL_ENABLED = os.getenv("EDGE_SCROLL_ENABLED", "1") == "1"
 EDGE_MARGIN = float(os.getenv("EDGE_MARGIN", "0.08"))      # top/bottom 8% of screen
-SCROLL_SPEED = int(os.getenv("SCROLL_SPEED", "80"))        # pyautogui.scroll units per tick
+SCROLL_SPEED = int(os.getenv("SCROLL_SPEED", "80"))        # scroll units per tick
 SCROLL_EVERY_MS = int(os.getenv("SCROLL_EVERY_MS", "60"))
 
 # Misc
-pyautogui.FAILSAFE = False
-pyautogui.PAUSE = 0
-
 running = True
 
 def handle_signal(signum, frame):
@@ -48,119 +65,75 @@ signal.signal(signal.SIGINT, handle_signal)
 if hasattr(signal, "SIGTERM"):
     signal.signal(signal.SIGTERM, handle_signal)
 
-def lerp(a, b, t): return a + (b - a) * t
-
 def main():
     global running
 
-    cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_DSHOW)
+    # Camera device, or the shared frame bus when FRAME_BUS is set
+    cap = open_capture(CAM_INDEX, FRAME_BUS)
     if not cap.isOpened():
         print("ERROR: Could not open camera.", file=sys.stderr, flush=True)
         return 1
-
-    face_mesh = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True)
-    screen_w, screen_h = pyautogui.size()
-
-    cur_x, cur_y = pyautogui.position()
-    last_click_time = 0.0
-
-    # Blink detection
-    blink_history = deque(maxlen=5)
-    last_blink_time = 0.0  # for double-blink
-
-    # Dwell state
-    dwell_anchor = None
-    dwell_start = None
-
-    # Scroll pacing
-    last_scroll_ms = 0
-
-    print("Eye mouse started.", flush=True)
+    # Keep the driver queue short so frames after an idle sleep are fresh
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    profile = get_profile(TRACKER_PROFILE)
+    apply_threads(profile)
+    face_mesh = make_face_mesh(profile)
+    pointer = face_pointer_index(profile)
+    actuator = CursorActuator().start()
+
+    cursor_filter = make_filter(CURSOR_FILTER, SMOOTHING)
+    cursor_filter.reset(*actuator.position())
+    recorder = LandmarkRecorder(RECORD_LANDMARKS) if RECORD_LANDMARKS else None
+
+    # Users who have not calibrated yet share the "default" calibration if there is one
+    gaze_profile = calibrated_profile(GAZE_PROFILE) if GAZE_CALIBRATION else None
+    gaze_mapper = load_mapper(gaze_profile, iris=pointer == 476) if gaze_profile else None
+
+    # Blink / double-blink / dwell / edge scroll, evaluated over a feature history
+    gestures = GestureEngine(EYE_FEATURES, eye_gestures(
+        blink_gap=BLINK_GAP_THRESH, blink_frames=BLINK_CONSEC_FRAMES,
+        double_window_s=DOUBLE_BLINK_WINDOW_S, click_cooldown=CLICK_COOLDOWN,
+        dwell=DWELL_ENABLED, dwell_s=DWELL_TIME_S, dwell_radius_px=DWELL_RADIUS_PX,
+        edge_scroll=EDGE_SCROLL_ENABLED, edge_margin=EDGE_MARGIN, scroll_every_s=SCROLL_EVERY_MS / 1000.0,
+    ))
+    # Landmarks -> gaze -> filtered cursor, gestures -> clicks/scroll (tracker_steps.py)
+    step = EyeStep(actuator, cursor_filter, gestures, pointer=pointer, gaze_mapper=gaze_mapper,
+                   scroll_speed=SCROLL_SPEED)
+
+    # Frame rate governor (activity = iris or eyelid movement)
+    governor = FrameGovernor("eye")
+
+    calibration = f"gaze calibration '{gaze_profile}'" if gaze_mapper else "uncalibrated"
+    print(f"Eye mouse started ({profile['name']} profile, {calibration}).", flush=True)
 
     try:
         while running:
-            ok, frame = cap.read()
+            governor.wait()
+            # Mirrored like a selfie view; bus frames are flipped straight out of shared memory
+            ok, frame = read_mirrored(cap)
             if not ok:
                 continue
+            frame_t = time.perf_counter()
 
-            frame = cv2.flip(frame, 1)
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            out = face_mesh.process(rgb)
+            out = face_mesh.process(inference_input(rgb, profile))
             lm_points = out.multi_face_landmarks
+            if recorder:
+                recorder.write(frame_t, lm_points[0].landmark if lm_points else None)
 
             frame_h, frame_w = frame.shape[:2]
 
-            target_x, target_y = None, None
-            if lm_points:
-                lms = lm_points[0].landmark
-
-                # Use iris landmark slice 474..477; take idx==1 (landmark 476) for pointing
-                for idx, lm in enumerate(lms[474:478]):
-                    x = int(lm.x * frame_w)
-                    y = int(lm.y * frame_h)
-                    if DRAW_DEBUG and SHOW_WINDOW:
-                        cv2.circle(frame, (x, y), 3, (0, 255, 0), -1)
-                    if idx == 1:
-                        target_x = lm.x * screen_w
-                        target_y = lm.y * screen_h
-
-                if target_x is not None:
-                    cur_x = lerp(cur_x, target_x, SMOOTHING)
-                    cur_y = lerp(cur_y, target_y, SMOOTHING)
-                    pyautogui.moveTo(cur_x, cur_y)
+            pts, motion = step(lm_points[0].landmark if lm_points else None, frame_t)
 
+            if pts is not None and DRAW_DEBUG and SHOW_WINDOW:
+                # Pointer: iris landmark 476 (slice 474..477 drawn), or the nose tip without iris refinement
+                drawn = pts[474:478] if pointer == 476 else pts[pointer:pointer + 1]
+                for x, y in (drawn[:, :2] * (frame_w, frame_h)).astype(int):
+                    cv2.circle(frame, (int(x), int(y)), 3, (0, 255, 0), -1)
                 # Blink from eyelid gap (145 upper, 159 lower)
-                left = [lms[145], lms[159]]
-                if DRAW_DEBUG and SHOW_WINDOW:
-                    for lm in left:
-                        cv2.circle(frame, (int(lm.x*frame_w), int(lm.y*frame_h)), 3, (0, 255, 255), -1)
-
-                eye_gap = left[0].y - left[1].y
-                blink_history.append(eye_gap)
-                is_blink = sum(1 for g in blink_history if g < BLINK_GAP_THRESH) >= BLINK_CONSEC_FRAMES
-
-                now = time.time()
-                if is_blink and (now - last_click_time) > CLICK_COOLDOWN:
-                    # Double-blink detection
-                    if (now - last_blink_time) <= DOUBLE_BLINK_WINDOW_S:
-                        pyautogui.doubleClick()
-                        last_click_time = now
-                        last_blink_time = 0.0
-                    else:
-                        pyautogui.click()
-                        last_click_time = now
-                        last_blink_time = now
-
-            # ----- Dwell Click -----
-            if DWELL_ENABLED and target_x is not None:
-                pos = (cur_x, cur_y)
-                t = time.time()
-                if dwell_anchor is None:
-                    dwell_anchor = pos
-                    dwell_start = t
-                else:
-                    dx = pos[0] - dwell_anchor[0]
-                    dy = pos[1] - dwell_anchor[1]
-                    if (dx*dx + dy*dy) ** 0.5 <= DWELL_RADIUS_PX:
-                        if t - dwell_start >= DWELL_TIME_S and (t - last_click_time) > CLICK_COOLDOWN:
-                            pyautogui.click()
-                            last_click_time = t
-                            dwell_start = t  # restart dwell timer
-                    else:
-                        dwell_anchor = pos
-                        dwell_start = t
-
-            # ----- Edge Scroll -----
-            if EDGE_SCROLL_ENABLED and target_y is not None:
-                y_norm = target_y / screen_h
-                now_ms = int(time.time() * 1000)
-                if now_ms - last_scroll_ms >= SCROLL_EVERY_MS:
-                    if y_norm < EDGE_MARGIN:
-                        pyautogui.scroll(SCROLL_SPEED)
-                        last_scroll_ms = now_ms
-                    elif y_norm > 1.0 - EDGE_MARGIN:
-                        pyautogui.scroll(-SCROLL_SPEED)
-                        last_scroll_ms = now_ms
+                for x, y in (pts[[EYELID_LOWER, EYELID_UPPER], :2] * (frame_w, frame_h)).astype(int):
+                    cv2.circle(frame, (int(x), int(y)), 3, (0, 255, 255), -1)
 
             # ----- UI window -----
             if SHOW_WINDOW:
@@ -176,11 +149,17 @@ def main():
             else:
                 cv2.waitKey(1)
 
+            governor.update(present=pts is not None, motion=motion)
+
     except Exception as e:
         print(f"ERROR: {e}", file=sys.stderr, flush=True)
     finally:
         running = False
         cap.release()
+        actuator.stop()
+        print(governor.report(), flush=True)
+        if recorder:
+            recorder.close()
         if SHOW_WINDOW:
             try: cv2.destroyAllWindows()
             except Exception: pass
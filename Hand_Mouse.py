@@ -5,14 +5,29 @@ import signal
 import time
 
 import cv2
-import mediapipe as mp
-import pyautogui
+import numpy as np
+
+from cursor_actuator import CursorActuator
+from cursor_filter import make_filter
+from frame_bus import open_capture, read_mirrored
+from frame_governor import FrameGovernor
+from gesture_engine import HAND_FEATURES, GestureEngine, hand_gestures
+from landmark_features import INDEX_TIP, MIDDLE_TIP, THUMB_TIP, WRIST
+from landmark_stream import LandmarkRecorder
+from tracker_profiles import apply_threads, get_profile, inference_input, make_hands
+from tracker_steps import HandStep
 
 # ========= Settings =========
 CAM_INDEX = int(os.getenv("CAM_INDEX", "0"))
+FRAME_BUS = os.getenv("FRAME_BUS", "")   # read frames from `python frame_bus.py publish` instead
 SHOW_WINDOW = os.getenv("SHOW_WINDOW", "1") == "1"
 DRAW_DEBUG = True
 
+# MediaPipe performance profile: lite | balanced | accurate (see tracker_profiles.py)
+TRACKER_PROFILE = os.getenv("TRACKER_PROFILE", "balanced")
+
+# Cursor filter: one_euro | kalman | lerp (lerp uses SMOOTHING 0..1)
+CURSOR_FILTER = os.getenv("CURSOR_FILTER", "one_euro")
 SMOOTHING = float(os.getenv("SMOOTHING", "0.30"))
 CLICK_COOLDOWN = float(os.getenv("CLICK_COOLDOWN", "0.25"))
 
@@ -33,8 +48,8 @@ SCROLL_SAMPLE_MS = int(os.getenv("SCROLL_SAMPLE_MS", "40"))
 SPREAD_DRAG_ENABLED = os.getenv("SPREAD_DRAG_ENABLED", "1") == "1"
 FINGER_EXT_THRESH = float(os.getenv("FINGER_EXT_THRESH", "0.2"))  # y-distance below wrist (lower y)
 
-pyautogui.FAILSAFE = False
-pyautogui.PAUSE = 0
+# Record landmarks to a JSON-lines stream for replay/benchmarks (empty = off)
+RECORD_LANDMARKS = os.getenv("RECORD_LANDMARKS", "")
 
 running = True
 
@@ -46,127 +61,68 @@ signal.signal(signal.SIGINT, handle_signal)
 if hasattr(signal, "SIGTERM"):
     signal.signal(signal.SIGTERM, handle_signal)
 
-def lerp(a, b, t):
-    return a + (b - a) * t
-
-def dist(a, b):
-    return ((a[0]-b[0])**2 + (a[1]-b[1])**2) ** 0.5
-
 def main():
     global running
 
-    cap = cv2.VideoCapture(CAM_INDEX, cv2.CAP_DSHOW)
+    # Camera device, or the shared frame bus when FRAME_BUS is set
+    cap = open_capture(CAM_INDEX, FRAME_BUS)
     if not cap.isOpened():
         print("ERROR: Cannot open camera", file=sys.stderr)
         return 1
+    # Keep the driver queue short so frames after an idle sleep are fresh
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-    hands = mp.solutions.hands.Hands(max_num_hands=1, min_detection_confidence=0.7)
-    screen_w, screen_h = pyautogui.size()
+    profile = get_profile(TRACKER_PROFILE)
+    apply_threads(profile)
+    hands = make_hands(profile)
+    actuator = CursorActuator().start()
 
-    cur_x, cur_y = pyautogui.position()
-    last_click_time = 0.0
+    cursor_filter = make_filter(CURSOR_FILTER, SMOOTHING)
+    cursor_filter.reset(*actuator.position())
+    recorder = LandmarkRecorder(RECORD_LANDMARKS) if RECORD_LANDMARKS else None
+    debug_points = np.array([THUMB_TIP, INDEX_TIP, MIDDLE_TIP, WRIST])
 
-    # Pinch state
-    pinch_active = False
-    pinch_start_t = 0.0
-    last_scroll_ms = 0
-    last_cursor_y = None
+    # Spread drag / pinch click / hold right-click / pinch scroll, evaluated over a feature history
+    gestures = GestureEngine(HAND_FEATURES, hand_gestures(
+        pinch_close=PINCH_CLOSE_THRESH, pinch_release=PINCH_RELEASE_THRESH,
+        hold_right_s=PINCH_HOLD_RIGHTCLICK_S, finger_ext=FINGER_EXT_THRESH, click_cooldown=CLICK_COOLDOWN,
+        scroll=SCROLL_ENABLED, scroll_every_s=SCROLL_SAMPLE_MS / 1000.0, drag=SPREAD_DRAG_ENABLED,
+    ))
+    # Landmarks -> index tip -> filtered cursor, gestures -> clicks/drag/scroll (tracker_steps.py)
+    step = HandStep(actuator, cursor_filter, gestures, scroll_gain=SCROLL_GAIN)
 
-    # Drag state (spread fingers)
-    dragging = False
+    # Frame rate governor (activity = index tip or pinch movement)
+    governor = FrameGovernor("hand")
 
-    print("Hand mouse started.", flush=True)
+    print(f"Hand mouse started ({profile['name']} profile).", flush=True)
 
     try:
         while running:
-            ok, frame = cap.read()
+            governor.wait()
+            # Mirrored like a selfie view; bus frames are flipped straight out of shared memory
+            ok, frame = read_mirrored(cap)
             if not ok:
                 continue
+            frame_t = time.perf_counter()
 
-            frame = cv2.flip(frame, 1)
             rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            out = hands.process(rgb)
+            out = hands.process(inference_input(rgb, profile))
             frame_h, frame_w = frame.shape[:2]
-
-            if out.multi_hand_landmarks:
-                hand = out.multi_hand_landmarks[0]
-                lms = hand.landmark
-
-                # Points
-                thumb_tip = (lms[4].x, lms[4].y)
-                index_tip = (lms[8].x, lms[8].y)
-                middle_tip = (lms[12].x, lms[12].y)
-                wrist = (lms[0].x, lms[0].y)
-
-                # Cursor follows index finger
-                target_x = index_tip[0] * screen_w
-                target_y = index_tip[1] * screen_h
-                cur_x = lerp(cur_x, target_x, SMOOTHING)
-                cur_y = lerp(cur_y, target_y, SMOOTHING)
-                pyautogui.moveTo(cur_x, cur_y)
-
-                # Pinch measure
-                pinch_d = dist(thumb_tip, index_tip)
-
-                now = time.time()
-
-                # Determine finger extension relative to wrist (y-axis)
-                # (In image coords, y grows down, so "extended upward" means lower y than wrist by threshold)
-                index_extended = (wrist[1] - index_tip[1]) > FINGER_EXT_THRESH
-                middle_extended = (wrist[1] - middle_tip[1]) > FINGER_EXT_THRESH
-
-                # ---- Spread drag (index + middle extended) ----
-                want_drag = SPREAD_DRAG_ENABLED and index_extended and middle_extended
-
-                if want_drag and not dragging:
-                    pyautogui.mouseDown()
-                    dragging = True
-                elif dragging and not want_drag:
-                    pyautogui.mouseUp()
-                    dragging = False
-
-                # ---- Pinch logic ----
-                if not pinch_active and pinch_d < PINCH_CLOSE_THRESH:
-                    pinch_active = True
-                    pinch_start_t = now
-                    last_cursor_y = cur_y
-                elif pinch_active and pinch_d > PINCH_RELEASE_THRESH:
-                    # Pinch released -> classify short vs hold
-                    pinch_active = False
-                    held = now - pinch_start_t
-                    if not dragging and (now - last_click_time) > CLICK_COOLDOWN:
-                        if held >= PINCH_HOLD_RIGHTCLICK_S:
-                            pyautogui.click(button="right")
-                        else:
-                            pyautogui.click()
-                        last_click_time = now
-                    last_cursor_y = None
-
-                # ---- Pinch + vertical move => Scroll ----
-                if SCROLL_ENABLED and pinch_active and not dragging:
-                    # Sample at intervals
-                    ms = int(now * 1000)
-                    if last_cursor_y is not None and (ms - last_scroll_ms) >= SCROLL_SAMPLE_MS:
-                        dy = cur_y - last_cursor_y  # pixels
-                        if abs(dy) > 2:
-                            scroll_amount = int(-(dy / screen_h) * SCROLL_GAIN)
-                            if scroll_amount != 0:
-                                pyautogui.scroll(scroll_amount)
-                                last_scroll_ms = ms
-                        last_cursor_y = cur_y
-                    elif last_cursor_y is None:
-                        last_cursor_y = cur_y
-
-                # ---- Debug draw ----
-                if DRAW_DEBUG and SHOW_WINDOW:
-                    for idx in [4, 8, 12, 0]:
-                        cx, cy = int(lms[idx].x * frame_w), int(lms[idx].y * frame_h)
-                        cv2.circle(frame, (cx, cy), 6, (0, 255, 0), -1)
-                    status = []
-                    if dragging: status.append("DRAG")
-                    if pinch_active: status.append("PINCH")
-                    cv2.putText(frame, " | ".join(status) or "MOVE",
-                                (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2, cv2.LINE_AA)
+            if recorder:
+                recorder.write(frame_t, out.multi_hand_landmarks[0].landmark if out.multi_hand_landmarks else None)
+
+            # Cursor follows index finger
+            pts, motion = step(out.multi_hand_landmarks[0].landmark if out.multi_hand_landmarks else None, frame_t)
+
+            # ---- Debug draw ----
+            if pts is not None and DRAW_DEBUG and SHOW_WINDOW:
+                for cx, cy in (pts[debug_points, :2] * (frame_w, frame_h)).astype(int):
+                    cv2.circle(frame, (int(cx), int(cy)), 6, (0, 255, 0), -1)
+                status = []
+                if SPREAD_DRAG_ENABLED and gestures.active("drag"): status.append("DRAG")
+                if gestures.active("click"): status.append("PINCH")
+                cv2.putText(frame, " | ".join(status) or "MOVE",
+                            (8, 24), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2, cv2.LINE_AA)
 
             # Window & keys
             if SHOW_WINDOW:
@@ -181,11 +137,17 @@ def main():
             else:
                 cv2.waitKey(1)
 
+            governor.update(present=pts is not None, motion=motion)
+
     except Exception as e:
         print("ERROR:", e, file=sys.stderr)
     finally:
         running = False
         cap.release()
+        actuator.stop()
+        print(governor.report(), flush=True)
+        if recorder:
+            recorder.close()
         if SHOW_WINDOW:
             try:
                 cv2.destroyAllWindows()
@@ -3,6 +3,7 @@ import sys
 import signal
 import subprocess
 import threading
+import time
 import sqlite3
 import datetime as dt
 from pathlib import Path
@@ -18,7 +19,7 @@ CORS(app)
 
 # ====== CONFIG ======
 ROOT = Path(__file__).resolve().parent
-DB_PATH = ROOT / "app.db"
+DB_PATH = Path(os.getenv("DB_PATH", ROOT / "app.db"))
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 TOKEN_MAX_AGE = 60 * 60 * 24 * 7  # 7 days
 ts = URLSafeTimedSerializer(SECRET_KEY)
@@ -26,6 +27,8 @@ ts = URLSafeTimedSerializer(SECRET_KEY)
 # Absolute paths or defaults next to app.py
 EYE_SCRIPT = Path(os.getenv("EYE_SCRIPT", ROOT / "Eye_Mouse.py"))
 HAND_SCRIPT = Path(os.getenv("HAND_SCRIPT", ROOT / "Hand_Mouse.py"))
+# Tracker stdout/stderr (start/stop, governor FPS/CPU stats) go here
+LOG_DIR = Path(os.getenv("LOG_DIR", ROOT / "logs"))
 
 # ====== DB helpers ======
 def get_db():
@@ -131,114 +134,269 @@ def api_me():
     row = db.execute("SELECT id, email, name FROM users WHERE id = ?", (g.user["uid"],)).fetchone()
     if not row:
         return jsonify({"ok": False, "error": "User not found"}), 404
-    return jsonify({"ok": True, "user": {"id": row["id"], "email": row["email"], "name": row["name"]}})
+    return jsonify({"ok": True, "user": {"id": row["id"], "email": row["email"], "name": row["name"],
+                                         "gaze_profile": gaze_profile(row["id"])}})
+
+# ====== Tracker sessions ======
+# Each user owns their own eye/hand sessions, keyed by (uid, mode). A session
+# holds one camera from CAMERA_INDEXES and one of MAX_TRACKERS slots; starts
+# beyond that wait in a FIFO queue (up to QUEUE_MAX) or are rejected with 429.
+# A stopping session keeps its slot and camera until its process has exited.
+def usable_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+CAMERA_INDEXES = [int(c) for c in os.getenv("CAMERA_INDEXES", os.getenv("CAM_INDEX", "0")).split(",") if c.strip()]
+MAX_TRACKERS = int(os.getenv("MAX_TRACKERS", "0")) or usable_cores()
+QUEUE_MAX = int(os.getenv("QUEUE_MAX", "4"))   # 0 = reject when every slot is busy
+RETRY_AFTER_S = int(os.getenv("RETRY_AFTER_S", "30"))
+STOP_TIMEOUT_S = float(os.getenv("STOP_TIMEOUT_S", "5"))   # SIGTERM grace before SIGKILL
+MODES = ("eye", "hand")
 
-# ====== Process management for Eye/Hand tracking ======
 state_lock = threading.Lock()
-processes = {"eye": None, "hand": None}
-
-def is_running(mode: str) -> bool:
-    proc = processes.get(mode)
-    return proc is not None and proc.poll() is None
-
-def stop_mode(mode: str):
-    with state_lock:
-        proc = processes.get(mode)
-        if proc and proc.poll() is None:
-            try:
-                if os.name == "nt":
-                    proc.terminate()
-                else:
-                    os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
-            except Exception:
-                pass
-            try:
-                proc.wait(timeout=5)
-            except Exception:
-                pass
-        processes[mode] = None
-
-def start_mode(mode: str):
-    script = EYE_SCRIPT if mode == "eye" else HAND_SCRIPT
-    script = Path(script)
+sessions = {}   # (uid, mode) -> {"proc", "camera", "cpus", "started_at", "stopping"}
+queue = []      # [(uid, mode)] waiting for a slot, oldest first
+
+class TrackerCapacityError(RuntimeError):
+    pass
+
+def capacity() -> int:
+    return min(MAX_TRACKERS, len(CAMERA_INDEXES))
+
+def free_camera():
+    used = {s["camera"] for s in sessions.values()}
+    for cam in CAMERA_INDEXES:
+        if cam not in used:
+            return cam
+    return None
+
+def session_cpus():
+    """A disjoint share of the cores for a new session (TRACKER_CPUS); empty = let the OS place it"""
+    if not hasattr(os, "sched_getaffinity"):
+        return []
+    cores = sorted(os.sched_getaffinity(0))
+    share = max(1, len(cores) // capacity())
+    used = {c for s in sessions.values() for c in s["cpus"]}
+    free = [c for c in cores if c not in used]
+    return free[:share] if len(free) >= share else []
+
+def gaze_profile(uid) -> str:
+    """Calibration name the user's eye tracker loads (`python gaze_calibration.py calibrate --profile <it>`)"""
+    return f"user-{uid}"
+
+def tracker_script(mode: str) -> Path:
+    script = Path(EYE_SCRIPT if mode == "eye" else HAND_SCRIPT)
     if not script.exists():
         raise FileNotFoundError(f"{script} not found")
-
-    other = "hand" if mode == "eye" else "eye"
-    stop_mode(other)
-
-    with state_lock:
-        if is_running(mode):
-            return processes[mode]
-
-        creationflags = 0
-        preexec_fn = None
-        if os.name != "nt":
-            preexec_fn = os.setsid
-
+    return script
+
+def spawn_session(uid, mode: str):
+    """Start the tracker process for (uid, mode) on a free camera; caller holds state_lock"""
+    script = tracker_script(mode)
+    camera = free_camera()
+    cpus = session_cpus()
+
+    creationflags = 0
+    preexec_fn = None
+    if os.name != "nt":
+        preexec_fn = os.setsid
+
+    env = dict(os.environ, CAM_INDEX=str(camera), GAZE_PROFILE=gaze_profile(uid),
+               TRACKER_CPUS=",".join(map(str, cpus)))
+    # Nobody reads a PIPE here; a long-running tracker would fill it and block
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOG_DIR / f"{mode}-{uid}.log", "a") as log:
         proc = subprocess.Popen(
             [sys.executable, str(script)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stdout=log,
+            stderr=subprocess.STDOUT,
             text=True,
+            env=env,
             creationflags=creationflags,
             preexec_fn=preexec_fn,
         )
-        processes[mode] = proc
-        return proc
+    sessions[(uid, mode)] = {"proc": proc, "camera": camera, "cpus": cpus, "started_at": time.time(),
+                             "stopping": False}
+    return proc
+
+def reap_sessions():
+    """Drop exited trackers and hand their slots to queued starts; caller holds state_lock"""
+    for key in [k for k, s in sessions.items() if s["proc"].poll() is not None]:
+        del sessions[key]
+    while len(sessions) < capacity():
+        # A start queued behind its own still-stopping session waits for it
+        nxt = next((k for k in queue if k not in sessions), None)
+        if nxt is None:
+            break
+        queue.remove(nxt)
+        uid, mode = nxt
+        try:
+            spawn_session(uid, mode)
+        except Exception as e:
+            print(f"ERROR: queued {mode} tracker for user {uid} failed to start: {e}", file=sys.stderr, flush=True)
+
+def is_running(uid, mode: str) -> bool:
+    s = sessions.get((uid, mode))
+    return s is not None and not s["stopping"] and s["proc"].poll() is None
+
+def signal_group(proc, sig):
+    """Send `sig` to the tracker's process group; on Windows there is only TerminateProcess"""
+    try:
+        if os.name == "nt":
+            proc.terminate()
+        else:
+            os.killpg(os.getpgid(proc.pid), sig)
+    except Exception:
+        pass
+
+def terminate(proc):
+    """SIGTERM the tracker's process group, SIGKILL it after STOP_TIMEOUT_S; returns once it has exited"""
+    if proc.poll() is not None:
+        return
+    signal_group(proc, signal.SIGTERM)
+    try:
+        proc.wait(timeout=STOP_TIMEOUT_S)
+    except subprocess.TimeoutExpired:
+        print(f"ERROR: tracker {proc.pid} ignored SIGTERM for {STOP_TIMEOUT_S:g}s; killing it",
+              file=sys.stderr, flush=True)
+        signal_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        proc.wait()
+
+def stop_mode(uid, mode: str):
+    with state_lock:
+        if (uid, mode) in queue:
+            queue.remove((uid, mode))
+        s = sessions.get((uid, mode))
+        if s is not None:
+            s["stopping"] = True
+    # Outside the lock: waiting for the tracker to exit must not stall other users.
+    # The session stays in `sessions` meanwhile, so its slot and camera are not handed out.
+    if s is not None:
+        terminate(s["proc"])
+    with state_lock:
+        if s is not None and sessions.get((uid, mode)) is s:
+            del sessions[(uid, mode)]
+        reap_sessions()
 
-def status_payload():
-    return {
-        "eye": {"running": is_running("eye"), "pid": processes["eye"].pid if processes["eye"] else None},
-        "hand": {"running": is_running("hand"), "pid": processes["hand"].pid if processes["hand"] else None},
-    }
+def start_mode(uid, mode: str) -> str:
+    """Start (or queue) uid's tracker; returns "running" or "queued", raises TrackerCapacityError when full"""
+    tracker_script(mode)
 
-@app.route("/api/eye-mouse/start", methods=["POST"])
-@auth_required
-def api_eye_start():
+    # One camera per user: switching modes stops the other tracker first
+    other = "hand" if mode == "eye" else "eye"
+    stop_mode(uid, other)
+
+    with state_lock:
+        reap_sessions()
+        if is_running(uid, mode):
+            return "running"
+        if (uid, mode) in queue:
+            return "queued"
+        if (uid, mode) not in sessions and len(sessions) < capacity():
+            spawn_session(uid, mode)
+            return "running"
+        if len(queue) < QUEUE_MAX:
+            queue.append((uid, mode))
+            return "queued"
+    raise TrackerCapacityError(
+        f"All {capacity()} tracker slots are busy and the queue is full; try again later")
+
+# ====== Per-session resource use ======
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def proc_usage(pid):
+    """CPU seconds and resident memory of `pid` from /proc (Linux); None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+    except (OSError, ValueError, IndexError):
+        return None
+    # fields[0] is field 3 (state) of proc(5); utime/stime are fields 14/15
+    return {"cpu_s": (int(fields[11]) + int(fields[12])) / CLK_TCK, "rss_mb": round(rss_kb / 1024, 1)}
+
+def session_status(uid, mode: str):
+    s = sessions.get((uid, mode))
+    if s is not None and s["stopping"] and s["proc"].poll() is None:
+        return {"running": False, "state": "stopping", "pid": s["proc"].pid, "camera": s["camera"]}
+    if s is not None and s["proc"].poll() is None:
+        uptime = time.time() - s["started_at"]
+        usage = proc_usage(s["proc"].pid)
+        if usage is not None:
+            usage["cpu_pct"] = round(100 * usage["cpu_s"] / max(uptime, 1e-3), 1)
+            usage["cpu_s"] = round(usage["cpu_s"], 2)
+        return {"running": True, "state": "running", "pid": s["proc"].pid, "camera": s["camera"],
+                "cpus": s["cpus"], "uptime_s": round(uptime, 1), "usage": usage}
+    if (uid, mode) in queue:
+        return {"running": False, "state": "queued", "pid": None, "queue_position": queue.index((uid, mode)) + 1}
+    return {"running": False, "state": "stopped", "pid": None}
+
+def status_payload(uid):
+    with state_lock:
+        reap_sessions()
+        payload = {mode: session_status(uid, mode) for mode in MODES}
+        payload["scheduler"] = {
+            "capacity": capacity(),
+            "running": sum(1 for s in sessions.values() if not s["stopping"]),
+            "stopping": sum(1 for s in sessions.values() if s["stopping"]),
+            "queued": len(queue),
+            "cameras_free": sum(1 for c in CAMERA_INDEXES if c not in {s["camera"] for s in sessions.values()}),
+        }
+    return payload
+
+def start_response(mode: str):
+    uid = g.user["uid"]
     try:
-        start_mode("eye")
-        return jsonify({"ok": True, "mode": "eye", "status": status_payload()})
+        state = start_mode(uid, mode)
+    except TrackerCapacityError as e:
+        return (jsonify({"ok": False, "mode": mode, "error": str(e), "status": status_payload(uid)}),
+                429, {"Retry-After": str(RETRY_AFTER_S)})
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
+    body = {"ok": True, "mode": mode, "state": state, "status": status_payload(uid)}
+    return jsonify(body), (202 if state == "queued" else 200)
+
+@app.route("/api/eye-mouse/start", methods=["POST"])
+@auth_required
+def api_eye_start():
+    return start_response("eye")
 
 @app.route("/api/eye-mouse/stop", methods=["POST"])
 @auth_required
 def api_eye_stop():
-    stop_mode("eye")
-    return jsonify({"ok": True, "mode": "eye", "status": status_payload()})
+    stop_mode(g.user["uid"], "eye")
+    return jsonify({"ok": True, "mode": "eye", "status": status_payload(g.user["uid"])})
 
 @app.route("/api/eye-mouse/status", methods=["GET"])
 @auth_required
 def api_eye_status():
-    return jsonify({"ok": True, "mode": "eye", "status": status_payload()})
+    return jsonify({"ok": True, "mode": "eye", "status": status_payload(g.user["uid"])})
 
 @app.route("/api/hand-mouse/start", methods=["POST"])
 @auth_required
 def api_hand_start():
-    try:
-        start_mode("hand")
-        return jsonify({"ok": True, "mode": "hand", "status": status_payload()})
-    except Exception as e:
-        return jsonify({"ok": False, "error": str(e)}), 500
+    return start_response("hand")
 
 @app.route("/api/hand-mouse/stop", methods=["POST"])
 @auth_required
 def api_hand_stop():
-    stop_mode("hand")
-    return jsonify({"ok": True, "mode": "hand", "status": status_payload()})
+    stop_mode(g.user["uid"], "hand")
+    return jsonify({"ok": True, "mode": "hand", "status": status_payload(g.user["uid"])})
 
 @app.route("/api/hand-mouse/status", methods=["GET"])
 @auth_required
 def api_hand_status():
-    return jsonify({"ok": True, "mode": "hand", "status": status_payload()})
+    return jsonify({"ok": True, "mode": "hand", "status": status_payload(g.user["uid"])})
 
 @app.route("/api/kill-all", methods=["POST"])
 @auth_required
 def api_kill_all():
-    stop_mode("eye")
-    stop_mode("hand")
-    return jsonify({"ok": True, "status": status_payload()})
+    # Only the caller's own sessions
+    for mode in MODES:
+        stop_mode(g.user["uid"], mode)
+    return jsonify({"ok": True, "status": status_payload(g.user["uid"])})
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
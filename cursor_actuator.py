@@ -0,0 +1,416 @@
+"""
+Cursor actuation for the Eye/Hand trackers.
+
+The trackers hand every cursor action to a CursorActuator instead of calling
+pyautogui directly. Moves are coalesced (only the newest target matters),
+sub-pixel moves are dropped and the rest are rate-limited to ACTUATE_HZ on a
+worker thread, so OS input overhead stays off the frame loop. Clicks, scrolls
+and mouseDown/mouseUp are queued in order; any pending move is flushed ahead
+of them so they land where the cursor was when they were issued.
+
+Backends (INPUT_BACKEND):
+    pyautogui - default, cross-platform
+    xtest     - X11 XTest via python-xlib (Linux)
+    uinput    - kernel uinput device via python-evdev (Linux, needs /dev/uinput access)
+    null      - no OS effect, tracks position only
+    recording - like null but keeps every call, for tests and benchmarks
+"""
+
+import os
+import sys
+import threading
+import time
+
+# ========= Actuation settings (env overrides) =========
+INPUT_BACKEND = os.getenv("INPUT_BACKEND", "pyautogui")
+ACTUATE_HZ = float(os.getenv("ACTUATE_HZ", "60"))          # max cursor moves per second (display refresh)
+MOVE_EPS_PX = float(os.getenv("MOVE_EPS_PX", "1.0"))       # moves smaller than this are dropped
+SCREEN_SIZE = os.getenv("SCREEN_SIZE", "")                  # "WxH"; required by uinput/null without pyautogui
+
+
+def _screen_size_from_env():
+    if SCREEN_SIZE:
+        w, h = SCREEN_SIZE.lower().split("x")
+        return int(w), int(h)
+    return None
+
+
+# ====== Backends ======
+class PyAutoGUIBackend:
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+        pyautogui.FAILSAFE = False
+        pyautogui.PAUSE = 0
+        self._pg = pyautogui
+
+    def size(self):
+        return tuple(self._pg.size())
+
+    def position(self):
+        return tuple(self._pg.position())
+
+    def move(self, x, y):
+        self._pg.moveTo(x, y)
+
+    def click(self, button="left", clicks=1):
+        self._pg.click(button=button, clicks=clicks)
+
+    def scroll(self, amount):
+        self._pg.scroll(amount)
+
+    def mouse_down(self, button="left"):
+        self._pg.mouseDown(button=button)
+
+    def mouse_up(self, button="left"):
+        self._pg.mouseUp(button=button)
+
+    def close(self):
+        pass
+
+
+class XTestBackend:
+    """X11 XTest fake input; avoids pyautogui's per-call overhead on Linux"""
+    name = "xtest"
+    _BUTTON_CODES = {"left": 1, "middle": 2, "right": 3}
+
+    def __init__(self):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+        self._X = X
+        self._xtest = xtest
+        self._d = display.Display()
+        self._root = self._d.screen().root
+
+    def size(self):
+        s = self._d.screen()
+        return s.width_in_pixels, s.height_in_pixels
+
+    def position(self):
+        p = self._root.query_pointer()
+        return p.root_x, p.root_y
+
+    def move(self, x, y):
+        self._xtest.fake_input(self._d, self._X.MotionNotify, x=int(x), y=int(y))
+        self._d.sync()
+
+    def _press(self, code):
+        self._xtest.fake_input(self._d, self._X.ButtonPress, code)
+        self._xtest.fake_input(self._d, self._X.ButtonRelease, code)
+
+    def click(self, button="left", clicks=1):
+        for _ in range(clicks):
+            self._press(self._BUTTON_CODES[button])
+        self._d.sync()
+
+    def scroll(self, amount):
+        # Buttons 4/5 are wheel up/down; one press per unit like pyautogui on X11
+        code = 4 if amount > 0 else 5
+        for _ in range(abs(int(amount))):
+            self._press(code)
+        self._d.sync()
+
+    def mouse_down(self, button="left"):
+        self._xtest.fake_input(self._d, self._X.ButtonPress, self._BUTTON_CODES[button])
+        self._d.sync()
+
+    def mouse_up(self, button="left"):
+        self._xtest.fake_input(self._d, self._X.ButtonRelease, self._BUTTON_CODES[button])
+        self._d.sync()
+
+    def close(self):
+        self._d.close()
+
+
+class UInputBackend:
+    """Absolute-pointer uinput device; works under X11 and Wayland"""
+    name = "uinput"
+
+    def __init__(self):
+        from evdev import AbsInfo, UInput, ecodes as e
+        size = _screen_size_from_env()
+        if size is None:
+            raise RuntimeError("uinput backend needs SCREEN_SIZE=WxH")
+        self._e = e
+        self._w, self._h = size
+        caps = {
+            e.EV_KEY: [e.BTN_LEFT, e.BTN_MIDDLE, e.BTN_RIGHT],
+            e.EV_REL: [e.REL_WHEEL],
+            e.EV_ABS: [
+                (e.ABS_X, AbsInfo(0, 0, self._w - 1, 0, 0, 0)),
+                (e.ABS_Y, AbsInfo(0, 0, self._h - 1, 0, 0, 0)),
+            ],
+        }
+        self._ui = UInput(caps, name="hci-tracker-pointer")
+        self._codes = {"left": e.BTN_LEFT, "middle": e.BTN_MIDDLE, "right": e.BTN_RIGHT}
+        self._pos = (self._w // 2, self._h // 2)
+
+    def size(self):
+        return self._w, self._h
+
+    def position(self):
+        # uinput is write-only; report the last position we set
+        return self._pos
+
+    def move(self, x, y):
+        e = self._e
+        self._pos = (int(x), int(y))
+        self._ui.write(e.EV_ABS, e.ABS_X, self._pos[0])
+        self._ui.write(e.EV_ABS, e.ABS_Y, self._pos[1])
+        self._ui.syn()
+
+    def _button(self, button, value):
+        self._ui.write(self._e.EV_KEY, self._codes[button], value)
+        self._ui.syn()
+
+    def click(self, button="left", clicks=1):
+        for _ in range(clicks):
+            self._button(button, 1)
+            self._button(button, 0)
+
+    def scroll(self, amount):
+        self._ui.write(self._e.EV_REL, self._e.REL_WHEEL, int(amount))
+        self._ui.syn()
+
+    def mouse_down(self, button="left"):
+        self._button(button, 1)
+
+    def mouse_up(self, button="left"):
+        self._button(button, 0)
+
+    def close(self):
+        self._ui.close()
+
+
+class NullBackend:
+    """No OS input; keeps the cursor position so trackers run headless"""
+    name = "null"
+
+    def __init__(self, size=None):
+        self._size = size or _screen_size_from_env() or (1920, 1080)
+        self._pos = (self._size[0] // 2, self._size[1] // 2)
+
+    def size(self):
+        return self._size
+
+    def position(self):
+        return self._pos
+
+    def move(self, x, y):
+        self._pos = (x, y)
+
+    def click(self, button="left", clicks=1):
+        pass
+
+    def scroll(self, amount):
+        pass
+
+    def mouse_down(self, button="left"):
+        pass
+
+    def mouse_up(self, button="left"):
+        pass
+
+    def close(self):
+        pass
+
+
+class RecordingBackend(NullBackend):
+    """Null backend that keeps (time, action, args) for every call"""
+    name = "recording"
+
+    def __init__(self, size=None, clock=time.perf_counter):
+        super().__init__(size)
+        self.events = []
+        self._clock = clock
+
+    def _log(self, action, *args):
+        self.events.append((self._clock(), action, args))
+
+    def move(self, x, y):
+        super().move(x, y)
+        self._log("move", x, y)
+
+    def click(self, button="left", clicks=1):
+        self._log("click", button, clicks)
+
+    def scroll(self, amount):
+        self._log("scroll", amount)
+
+    def mouse_down(self, button="left"):
+        self._log("mouse_down", button)
+
+    def mouse_up(self, button="left"):
+        self._log("mouse_up", button)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "xtest": XTestBackend,
+    "uinput": UInputBackend,
+    "null": NullBackend,
+    "recording": RecordingBackend,
+}
+
+
+def make_backend(name=None):
+    name = (name or INPUT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}' (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+# ====== Actuator ======
+class CursorActuator:
+    """
+    Coalescing, rate-limited front end to an input backend.
+
+    With threaded=True (default) a worker thread performs the OS calls; with
+    threaded=False every call drains the queue inline. The rate limit runs on
+    `clock`; replays and tests pass their stream time so which moves are sent
+    does not depend on how fast the machine replays.
+    """
+
+    def __init__(self, backend=None, rate_hz=None, min_move_px=None, threaded=True, clock=time.perf_counter):
+        self.backend = backend if backend is not None else make_backend()
+        self.min_interval = 1.0 / (rate_hz or ACTUATE_HZ)
+        self.min_move_px = MOVE_EPS_PX if min_move_px is None else min_move_px
+        self.threaded = threaded
+        self._clock = clock
+
+        self._cond = threading.Condition()
+        self._pending = None          # newest move target not yet sent
+        self._events = []             # ordered non-move actions (with flushed moves)
+        self._last_pos = tuple(self.backend.position())
+        self._last_move_t = -float("inf")
+        self._running = False
+        self._thread = None
+
+        # Counters for benchmarks / logs
+        self.moves_requested = 0
+        self.moves_sent = 0
+
+    # --- lifecycle ---
+    def start(self):
+        if self.threaded and not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._worker, name="cursor-actuator", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._running:
+            with self._cond:
+                self._running = False
+                self._cond.notify()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        # Whatever is still queued (e.g. a final mouseUp) must reach the OS
+        self._drain(force_move=True)
+        self.backend.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- queries ---
+    def size(self):
+        return self.backend.size()
+
+    def position(self):
+        return self.backend.position()
+
+    # --- actions ---
+    def move_to(self, x, y):
+        with self._cond:
+            self._pending = (x, y)
+            self.moves_requested += 1
+            self._cond.notify()
+        if not self._running:
+            self._drain()
+
+    def _enqueue(self, action, *args):
+        with self._cond:
+            if self._pending is not None:
+                self._events.append(("move",) + self._pending)
+                self._pending = None
+            self._events.append((action,) + args)
+            self._cond.notify()
+        if not self._running:
+            self._drain()
+
+    def click(self, button="left"):
+        self._enqueue("click", button, 1)
+
+    def double_click(self, button="left"):
+        self._enqueue("click", button, 2)
+
+    def scroll(self, amount):
+        self._enqueue("scroll", int(amount))
+
+    def mouse_down(self, button="left"):
+        self._enqueue("mouse_down", button)
+
+    def mouse_up(self, button="left"):
+        self._enqueue("mouse_up", button)
+
+    # --- execution ---
+    def _send_move(self, x, y, force=False):
+        lx, ly = self._last_pos
+        if not force and abs(x - lx) < self.min_move_px and abs(y - ly) < self.min_move_px:
+            return
+        self.backend.move(x, y)
+        self._last_pos = (x, y)
+        self._last_move_t = self._clock()
+        self.moves_sent += 1
+
+    def _drain(self, force_move=False):
+        """Run queued actions; send the pending move if the rate limit allows. Returns seconds until it does."""
+        with self._cond:
+            events, self._events = self._events, []
+            pending = self._pending
+            wait = self.min_interval - (self._clock() - self._last_move_t)
+            if pending is not None and (force_move or wait <= 0):
+                self._pending = None
+            else:
+                pending = None
+
+        for ev in events:
+            action = ev[0]
+            if action == "move":
+                # Moves flushed ahead of a click are exact, never dropped or delayed
+                self._send_move(ev[1], ev[2], force=True)
+            elif action == "click":
+                self.backend.click(ev[1], ev[2])
+            elif action == "scroll":
+                self.backend.scroll(ev[1])
+            elif action == "mouse_down":
+                self.backend.mouse_down(ev[1])
+            elif action == "mouse_up":
+                self.backend.mouse_up(ev[1])
+        if pending is not None:
+            self._send_move(*pending)
+            return None
+        return wait if self._pending is not None else None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if self._pending is None and not self._events:
+                    self._cond.wait()
+                    continue
+            try:
+                wait = self._drain()
+            except Exception as e:
+                # A failing backend call must not kill actuation for the session
+                print(f"ERROR: input backend: {e}", file=sys.stderr, flush=True)
+                wait = None
+            if wait:
+                with self._cond:
+                    if self._running and not self._events:
+                        self._cond.wait(timeout=wait)
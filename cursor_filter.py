@@ -0,0 +1,341 @@
+"""
+Cursor filters for the Eye/Hand trackers.
+
+Every filter takes raw screen-space targets with a timestamp and returns the
+position to move the cursor to:
+
+    f = make_filter("one_euro")
+    f.reset(x, y, t)
+    x, y = f(target_x, target_y, t)
+
+`lerp`     - the original fixed exponential smoothing (SMOOTHING)
+`one_euro` - One-Euro filter: cutoff rises with speed, so steady at rest and
+             low lag while moving
+`kalman`   - constant-velocity Kalman filter per axis
+
+The One-Euro and Kalman filters also estimate velocity, so they can predict
+`lookahead` seconds ahead to hide pipeline latency (see LatencyMeter).
+
+Run `python cursor_filter.py --synthetic eye` (or `--stream rec.jsonl`) to
+compare lag / jitter of every filter on a landmark stream.
+"""
+
+import argparse
+import math
+import os
+
+# ========= Filter settings (env overrides) =========
+FILTER_MIN_CUTOFF = float(os.getenv("FILTER_MIN_CUTOFF", "1.0"))   # Hz, smoothing at rest
+FILTER_BETA = float(os.getenv("FILTER_BETA", "0.007"))             # cutoff gain per px/s
+FILTER_D_CUTOFF = float(os.getenv("FILTER_D_CUTOFF", "1.0"))       # Hz, velocity smoothing
+KALMAN_Q = float(os.getenv("KALMAN_Q", "1e8"))                     # accel noise while moving (px/s^2)^2
+KALMAN_Q_REST = float(os.getenv("KALMAN_Q_REST", "0.01"))          # fraction of KALMAN_Q while holding still
+KALMAN_R = float(os.getenv("KALMAN_R", "50"))                      # measurement noise px^2
+PREDICT_ENABLED = os.getenv("PREDICT_ENABLED", "1") == "1"
+PREDICT_MAX_MS = float(os.getenv("PREDICT_MAX_MS", "80"))          # never extrapolate further
+PREDICT_MIN_SPEED = float(os.getenv("PREDICT_MIN_SPEED", "300"))   # px/s; no prediction below, full at 2x
+CAMERA_LATENCY_MS = float(os.getenv("CAMERA_LATENCY_MS", "0"))     # sensor->read() delay, not measurable
+
+FILTER_KINDS = ("lerp", "one_euro", "kalman")
+
+_RAW_VELOCITY_TAU_S = 0.03   # smoothing of the raw velocity that gates prediction
+_MANEUVER_NIS = 9.0          # Kalman innovation beyond 3 sigma = the pointer started moving
+
+
+def _alpha(cutoff, dt):
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class CursorFilter:
+    """Base class: 2D filter with optional velocity-based prediction"""
+
+    def __init__(self):
+        self.lookahead = 0.0
+        self.x = self.y = None
+        self.vx = self.vy = 0.0
+        self.t = None
+        self._raw = None
+        self._rvx = self._rvy = 0.0
+
+    def reset(self, x, y, t=None):
+        self.x, self.y = float(x), float(y)
+        self.vx = self.vy = 0.0
+        self.t = t
+        self._raw = (self.x, self.y)
+        self._rvx = self._rvy = 0.0
+
+    def set_lookahead(self, seconds):
+        self.lookahead = min(max(seconds, 0.0), PREDICT_MAX_MS / 1000.0) if PREDICT_ENABLED else 0.0
+
+    def update(self, x, y, t):
+        raise NotImplementedError
+
+    def __call__(self, x, y, t):
+        if self.x is None:
+            self.reset(x, y, t)
+            return self.x, self.y
+        x, y = float(x), float(y)
+        dt = (t - self.t) if self.t is not None and t > self.t else 1.0 / 30
+        self.update(x, y, t)
+        self.t = t
+        # Short-window raw velocity: drops to noise level as soon as the pointer stops,
+        # while the filters' own velocity estimates lag behind
+        a = _alpha(1.0 / (2 * math.pi * _RAW_VELOCITY_TAU_S), dt)
+        self._rvx += a * ((x - self._raw[0]) / dt - self._rvx)
+        self._rvy += a * ((y - self._raw[1]) / dt - self._rvy)
+        self._raw = (x, y)
+        v2 = self.vx * self.vx + self.vy * self.vy
+        if not self.lookahead or v2 <= 0:
+            return self.x, self.y
+        # Predict only while the raw motion is clearly above fixation noise and agrees
+        # with the filter's velocity; otherwise stale velocity overshoots after every stop
+        gate = 1.0
+        if PREDICT_MIN_SPEED > 0:
+            gate = min(1.0, max(0.0, math.hypot(self._rvx, self._rvy) / PREDICT_MIN_SPEED - 1.0))
+        agree = min(1.0, max(0.0, (self.vx * self._rvx + self.vy * self._rvy) / v2))
+        ahead = self.lookahead * gate * agree
+        return self.x + self.vx * ahead, self.y + self.vy * ahead
+
+
+class LerpFilter(CursorFilter):
+    """Fixed exponential smoothing; no velocity estimate, so no prediction"""
+
+    def __init__(self, smoothing=0.25):
+        super().__init__()
+        self.smoothing = smoothing
+
+    def update(self, x, y, t):
+        self.x += (x - self.x) * self.smoothing
+        self.y += (y - self.y) * self.smoothing
+
+
+class OneEuroFilter(CursorFilter):
+    """One-Euro filter (Casiez et al. 2012) applied to both axes"""
+
+    def __init__(self, min_cutoff=None, beta=None, d_cutoff=None):
+        super().__init__()
+        self.min_cutoff = FILTER_MIN_CUTOFF if min_cutoff is None else min_cutoff
+        self.beta = FILTER_BETA if beta is None else beta
+        self.d_cutoff = FILTER_D_CUTOFF if d_cutoff is None else d_cutoff
+
+    def update(self, x, y, t):
+        dt = (t - self.t) if self.t is not None else 0.0
+        if dt <= 0:
+            dt = 1.0 / 30
+        a_d = _alpha(self.d_cutoff, dt)
+        self.vx += a_d * ((x - self.x) / dt - self.vx)
+        self.vy += a_d * ((y - self.y) / dt - self.vy)
+
+        speed = math.hypot(self.vx, self.vy)
+        a = _alpha(self.min_cutoff + self.beta * speed, dt)
+        self.x += a * (x - self.x)
+        self.y += a * (y - self.y)
+
+
+class KalmanFilter(CursorFilter):
+    """
+    Constant-velocity Kalman filter, independent per axis (state: pos, vel).
+    Process noise adapts: KALMAN_Q_REST * q while holding still, full q from
+    the first frame whose innovation exceeds 3 sigma (the pointer started
+    moving), so it is steady at rest without lagging on moves.
+    """
+
+    def __init__(self, q=None, r=None, q_rest=None):
+        super().__init__()
+        self.q = KALMAN_Q if q is None else q
+        self.r = KALMAN_R if r is None else r
+        self.q_rest = KALMAN_Q_REST if q_rest is None else q_rest
+        self._px = self._py = None
+        self._q_scale = 1.0
+        self._nis = 0.0
+
+    def reset(self, x, y, t=None):
+        super().reset(x, y, t)
+        # Covariance [p00, p01, p11] per axis
+        self._px = [self.r, 0.0, 1e6]
+        self._py = [self.r, 0.0, 1e6]
+        self._q_scale = 1.0
+
+    def _step(self, pos, vel, P, z, dt):
+        p00, p01, p11 = P
+        q = self.q * self._q_scale
+        # Predict
+        pos += vel * dt
+        dt2 = dt * dt
+        p00 += 2 * dt * p01 + dt2 * p11 + q * dt2 * dt2 / 4
+        p01 += dt * p11 + q * dt2 * dt / 2
+        p11 += q * dt2
+        # Update
+        s = p00 + self.r
+        k0, k1 = p00 / s, p01 / s
+        innov = z - pos
+        self._nis = max(self._nis, innov * innov / s)
+        pos += k0 * innov
+        vel += k1 * innov
+        P[0] = (1 - k0) * p00
+        P[1] = (1 - k0) * p01
+        P[2] = p11 - k1 * p01
+        return pos, vel
+
+    def update(self, x, y, t):
+        dt = (t - self.t) if self.t is not None else 0.0
+        if dt <= 0:
+            dt = 1.0 / 30
+        self._nis = 0.0
+        self.x, self.vx = self._step(self.x, self.vx, self._px, x, dt)
+        self.y, self.vy = self._step(self.y, self.vy, self._py, y, dt)
+        # Jump to full process noise on a maneuver, decay back towards q_rest
+        target = 1.0 if self._nis > _MANEUVER_NIS else self.q_rest
+        self._q_scale = target if target > self._q_scale else self._q_scale + 0.6 * (target - self._q_scale)
+
+
+def make_filter(kind="one_euro", smoothing=0.25):
+    """Build a filter by name; `smoothing` only applies to `lerp`"""
+    kind = (kind or "one_euro").lower().replace("-", "_")
+    if kind == "lerp":
+        return LerpFilter(smoothing)
+    if kind == "one_euro":
+        return OneEuroFilter()
+    if kind == "kalman":
+        return KalmanFilter()
+    raise ValueError(f"Unknown cursor filter '{kind}' (expected one of {', '.join(FILTER_KINDS)})")
+
+
+class LatencyMeter:
+    """Exponential moving average of capture->actuation latency, in seconds"""
+
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.value = CAMERA_LATENCY_MS / 1000.0
+        self._pipeline = None
+
+    def update(self, pipeline_s):
+        if self._pipeline is None:
+            self._pipeline = pipeline_s
+        else:
+            self._pipeline += self.alpha * (pipeline_s - self._pipeline)
+        self.value = self._pipeline + CAMERA_LATENCY_MS / 1000.0
+        return self.value
+
+
+# ====== Benchmark ======
+def run_filter(filt, samples, latency_s=0.0):
+    """Feed [(t, x, y) or (t, None, None)] through `filt`; returns [(t, x, y)] outputs"""
+    filt.set_lookahead(latency_s)
+    out = []
+    for t, x, y in samples:
+        if x is None:
+            continue
+        fx, fy = filt(x, y, t)
+        out.append((t, fx, fy))
+    return out
+
+
+def _lag_frames(out, ref, max_shift):
+    """Shift (frames) of `out` against `ref` with the lowest mean squared error, sub-frame interpolated"""
+    n = len(out)
+    errs = []
+    for shift in range(-max_shift, max_shift + 1):
+        err, cnt = 0.0, 0
+        for i in range(max(0, shift), min(n, n + shift)):
+            ox, oy = out[i]
+            rx, ry = ref[i - shift]
+            err += (ox - rx) ** 2 + (oy - ry) ** 2
+            cnt += 1
+        errs.append(err / cnt if cnt else float("inf"))
+    k = min(range(len(errs)), key=errs.__getitem__)
+    offset = 0.0
+    if 0 < k < len(errs) - 1:
+        a, b, c = errs[k - 1], errs[k], errs[k + 1]
+        denom = a - 2 * b + c
+        if denom > 0:
+            offset = 0.5 * (a - c) / denom
+    return k - max_shift + offset
+
+
+def filter_metrics(out, ref, latency_s=0.0, rest_speed_px_s=60.0, window=5):
+    """
+    Lag / jitter metrics of filtered output against a reference path.
+
+    lag_ms    - perceived lag: time shift that best aligns output with the
+                reference plus the pipeline latency (negative = ahead)
+    jitter_px - RMS frame-to-frame output motion while the reference is at rest
+    rmse_px   - RMS distance to the reference at zero shift
+    """
+    n = min(len(out), len(ref))
+    if n < 3:
+        return {"frames": n, "lag_ms": None, "jitter_px": None, "rmse_px": None}
+    ts = [o[0] for o in out[:n]]
+    pts = [(o[1], o[2]) for o in out[:n]]
+    ref = ref[:n]
+    dt = (ts[-1] - ts[0]) / (n - 1) or 1.0 / 30
+
+    lag = (_lag_frames(pts, ref, max_shift=int(0.3 / dt)) * dt + latency_s) * 1000.0
+
+    # "At rest": centered-window reference speed below threshold
+    jit, jcnt = 0.0, 0
+    for i in range(window, n - window):
+        a, b = ref[i - window], ref[i + window]
+        speed = math.hypot(b[0] - a[0], b[1] - a[1]) / (2 * window * dt)
+        if speed < rest_speed_px_s:
+            jit += (pts[i][0] - pts[i - 1][0]) ** 2 + (pts[i][1] - pts[i - 1][1]) ** 2
+            jcnt += 1
+
+    rmse = math.sqrt(sum((p[0] - r[0]) ** 2 + (p[1] - r[1]) ** 2 for p, r in zip(pts, ref)) / n)
+    return {
+        "frames": n,
+        "lag_ms": round(lag, 1),
+        "jitter_px": round(math.sqrt(jit / jcnt), 3) if jcnt else None,
+        "rmse_px": round(rmse, 2),
+    }
+
+
+def benchmark(frames, pointer, screen=(1920, 1080), latency_s=0.0, truth=None, smoothing=0.25):
+    """Run every filter kind over a landmark stream; returns {kind: metrics}"""
+    sw, sh = screen
+    samples = [(t, lm[pointer][0] * sw, lm[pointer][1] * sh) if lm else (t, None, None)
+               for t, lm in frames]
+    if truth is not None:
+        ref = [(x * sw, y * sh) for (t, lm), (x, y) in zip(frames, truth) if lm]
+    else:
+        ref = [(x, y) for _, x, y in samples if x is not None]
+
+    results = {"raw": filter_metrics([s for s in samples if s[1] is not None], ref, latency_s)}
+    for kind in FILTER_KINDS:
+        out = run_filter(make_filter(kind, smoothing), samples, latency_s)
+        results[kind] = filter_metrics(out, ref, latency_s)
+    return results
+
+
+def main():
+    from landmark_stream import load_stream, stream_pointer, synthetic_stream
+
+    parser = argparse.ArgumentParser(description="Compare cursor filters on a landmark stream")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--stream", help="Recorded landmark stream (JSON lines)")
+    src.add_argument("--synthetic", choices=["eye", "hand"], help="Use a generated stream")
+    parser.add_argument("--kind", choices=["eye", "hand"], default="eye",
+                        help="Tracker that recorded --stream (selects pointer landmark)")
+    parser.add_argument("--screen", default="1920x1080", help="Screen size WxH")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="Pipeline latency to predict over")
+    parser.add_argument("--smoothing", type=float, default=0.25, help="SMOOTHING for the lerp baseline")
+    args = parser.parse_args()
+
+    screen = tuple(int(v) for v in args.screen.lower().split("x"))
+    if args.synthetic:
+        frames, truth = synthetic_stream(args.synthetic)
+        pointer = stream_pointer(args.synthetic, frames)
+    else:
+        frames, truth = load_stream(args.stream), None
+        pointer = stream_pointer(args.kind, frames)
+
+    results = benchmark(frames, pointer, screen, args.latency_ms / 1000.0, truth, args.smoothing)
+    print(f"{'filter':<10} {'lag_ms':>8} {'jitter_px':>10} {'rmse_px':>8}")
+    for kind, m in results.items():
+        print(f"{kind:<10} {m['lag_ms']!s:>8} {m['jitter_px']!s:>10} {m['rmse_px']!s:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
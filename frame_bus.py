@@ -0,0 +1,390 @@
+"""
+Shared-memory frame bus: one process owns the camera, any number of
+processes read its frames.
+
+The publisher writes every captured frame into a ring of slots in a
+`multiprocessing.shared_memory` block. Each slot carries a sequence number
+that is negated while the slot is being written, so readers detect torn
+reads and retry instead of locking. The publisher never waits for readers;
+a reader that falls more than a ring behind just skips ahead (and counts the
+dropped frames).
+
+    python frame_bus.py publish --cam 0            # owns the camera
+    FRAME_BUS=hci_frames python Eye_Mouse.py       # reads from the bus
+    FRAME_BUS=hci_frames python Hand_Mouse.py
+
+Shared block layout (all int64 header fields):
+    header  [magic, slots, height, width, channels, head_seq, producer_pid, 0]
+    meta    slots x [seq, timestamp_ns]      (seq < 0 while being written)
+    frames  slots x height x width x channels uint8
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ========= Frame bus settings (env overrides) =========
+FRAME_BUS = os.getenv("FRAME_BUS", "")                     # bus name; empty = open the camera directly
+FRAME_BUS_SLOTS = int(os.getenv("FRAME_BUS_SLOTS", "4"))
+FRAME_BUS_TIMEOUT_S = float(os.getenv("FRAME_BUS_TIMEOUT_S", "5.0"))
+FRAME_BUS_EVERY = os.getenv("FRAME_BUS_EVERY", "0") == "1"   # read() returns every frame instead of the latest
+
+_MAGIC = 0x48434946  # "HCIF"
+_HEADER = 8
+_H_MAGIC, _H_SLOTS, _H_HEIGHT, _H_WIDTH, _H_CHANNELS, _H_HEAD, _H_PID = range(7)
+
+
+def _views(buf, slots, shape):
+    header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf)
+    meta = np.ndarray((slots, 2), dtype=np.int64, buffer=buf, offset=_HEADER * 8)
+    frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=buf,
+                        offset=(_HEADER + slots * 2) * 8)
+    return header, meta, frames
+
+
+def _attach(name):
+    """Attach to an existing block without letting this process' resource tracker unlink it on exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def _pid_alive(pid):
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        return True   # Windows frees a block with its last handle, so an existing one has a live owner
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def bus_owner(name):
+    """Pid of the live publisher of bus `name`, or None if there is none (or only a stale block)"""
+    try:
+        shm = _attach(name)
+    except FileNotFoundError:
+        return None
+    try:
+        header = np.ndarray((_HEADER,), dtype=np.int64, buffer=shm.buf)
+        pid = int(header[_H_PID]) if header[_H_MAGIC] == _MAGIC else 0
+        del header
+    finally:
+        shm.close()
+    return pid if _pid_alive(pid) else None
+
+
+class FrameBusBusy(RuntimeError):
+    pass
+
+
+class FramePublisher:
+    """Owns the shared block and writes frames into the ring"""
+
+    def __init__(self, name, shape, slots=None):
+        self.name = name
+        self.slots = slots or FRAME_BUS_SLOTS
+        self.shape = tuple(shape)
+        size = (_HEADER + self.slots * 2) * 8 + self.slots * int(np.prod(self.shape))
+
+        # A crashed publisher can leave a stale block behind; a live one keeps its bus
+        owner = bus_owner(name)
+        if owner is not None:
+            raise FrameBusBusy(f"Frame bus '{name}' is already published by pid {owner}")
+        try:
+            stale = _attach(name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._header, self._meta, self._frames = _views(self._shm.buf, self.slots, self.shape)
+        self._meta[:] = 0
+        self._header[:] = 0
+        self._header[_H_SLOTS] = self.slots
+        self._header[_H_HEIGHT:_H_CHANNELS + 1] = self.shape
+        self._header[_H_PID] = os.getpid()
+        self._header[_H_MAGIC] = _MAGIC   # last: readers only trust a block with the magic set
+        self.seq = 0
+
+    def publish(self, frame, ts_ns=None):
+        seq = self.seq + 1
+        i = seq % self.slots
+        self._meta[i, 0] = -seq                 # mark slot as being written
+        np.copyto(self._frames[i], frame)
+        self._meta[i, 1] = ts_ns if ts_ns is not None else time.monotonic_ns()
+        self._meta[i, 0] = seq
+        self._header[_H_HEAD] = seq
+        self.seq = seq
+        return seq
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._header[_H_MAGIC] = 0
+        del self._header, self._meta, self._frames
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+class FrameSubscriber:
+    """
+    Reader side. `latest()` / `next_frame()` return (seq, ts_ns, frame).
+    With copy=False the frame is a zero-copy view into the ring; it is only
+    valid while `valid(seq)` is True (the publisher reuses the slot after
+    `slots` more frames).
+
+    Also quacks like cv2.VideoCapture (read/isOpened/set/release) so the
+    trackers can use it in place of the camera.
+    """
+
+    def __init__(self, name, every_frame=None, timeout=None):
+        self.name = name
+        self.every_frame = FRAME_BUS_EVERY if every_frame is None else every_frame
+        self.timeout = FRAME_BUS_TIMEOUT_S if timeout is None else timeout
+        self.last_seq = 0
+        self.dropped = 0
+        self._shm = None
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._shm = _attach(name)
+                header = np.ndarray((_HEADER,), dtype=np.int64, buffer=self._shm.buf)
+                if header[_H_MAGIC] == _MAGIC:
+                    break
+                del header
+                self._shm.close()
+                self._shm = None
+            except FileNotFoundError:
+                pass
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(0.05)
+
+        self.slots = int(header[_H_SLOTS])
+        self.shape = tuple(int(v) for v in header[_H_HEIGHT:_H_CHANNELS + 1])
+        del header
+        self._header, self._meta, self._frames = _views(self._shm.buf, self.slots, self.shape)
+        self._out = np.empty(self.shape, dtype=np.uint8)
+        # Start from the current frame, not from the beginning of the ring
+        self.last_seq = max(int(self._header[_H_HEAD]) - 1, 0)
+
+    @property
+    def head(self):
+        return int(self._header[_H_HEAD])
+
+    def valid(self, seq):
+        """True while the slot holding `seq` has not been overwritten"""
+        return int(self._meta[seq % self.slots, 0]) == seq
+
+    def _read_slot(self, seq, copy):
+        i = seq % self.slots
+        if int(self._meta[i, 0]) != seq:
+            return None
+        ts = int(self._meta[i, 1])
+        if not copy:
+            return seq, ts, self._frames[i]
+        np.copyto(self._out, self._frames[i])
+        if int(self._meta[i, 0]) != seq:        # overwritten while copying
+            return None
+        return seq, ts, self._out
+
+    def latest(self, copy=True):
+        """Newest frame if it is newer than the last one returned, else None"""
+        for _ in range(3):
+            head = self.head
+            if head <= self.last_seq:
+                return None
+            got = self._read_slot(head, copy)
+            if got is not None:
+                if head - self.last_seq > 1:
+                    self.dropped += head - self.last_seq - 1
+                self.last_seq = head
+                return got
+        return None
+
+    def next_frame(self, copy=True):
+        """Frame after the last one returned; skips ahead if the ring has lapped us"""
+        head = self.head
+        if head <= self.last_seq:
+            return None
+        seq = self.last_seq + 1
+        # Keep one slot of headroom: the slot after head may be mid-write
+        oldest = max(head - self.slots + 2, 1)
+        if seq < oldest:
+            self.dropped += oldest - seq
+            seq = oldest
+        got = self._read_slot(seq, copy)
+        if got is None:
+            self.dropped += 1
+            self.last_seq = seq
+            return None
+        self.last_seq = seq
+        return got
+
+    def wait(self, copy=True, timeout=None):
+        """Block (polling) until a frame is available; None on timeout"""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        get = self.next_frame if self.every_frame else self.latest
+        while True:
+            got = get(copy)
+            if got is not None:
+                return got
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.001)
+
+    # --- cv2.VideoCapture compatible API ---
+    def isOpened(self):
+        return self._shm is not None
+
+    def read(self, transform=None):
+        """
+        Like cv2.VideoCapture.read(). With `transform` (a function returning a
+        new array, e.g. cv2.flip) the frame is transformed straight out of the
+        ring instead of being copied first; a frame overwritten meanwhile is
+        dropped and the next one taken.
+        """
+        if self._shm is None:
+            return False, None
+        for _ in range(3):
+            got = self.wait(copy=transform is None)
+            if got is None:
+                return False, None
+            if transform is None:
+                return True, got[2]
+            seq, _, view = got
+            frame = transform(view)
+            if self.valid(seq):
+                return True, frame
+            self.dropped += 1
+        return False, None
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        if self._shm is None:
+            return
+        del self._header, self._meta, self._frames
+        self._shm.close()
+        self._shm = None
+
+
+def read_mirrored(cap):
+    """(ok, frame) from a camera or bus, mirrored like the trackers show it; a bus frame is copied only once"""
+    import cv2
+    if isinstance(cap, FrameSubscriber):
+        return cap.read(transform=lambda view: cv2.flip(view, 1))
+    ok, frame = cap.read()
+    return ok, (cv2.flip(frame, 1) if ok else None)
+
+
+def open_capture(cam_index, bus=None):
+    """Camera for a tracker: the frame bus `bus` (default FRAME_BUS) if set, else the device itself"""
+    bus = FRAME_BUS if bus is None else bus
+    if bus:
+        return FrameSubscriber(bus)
+    import cv2
+    return cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
+
+
+running = True
+
+def handle_signal(signum, frame):
+    global running
+    running = False
+
+
+def publish_camera(name, cam_index, slots):
+    import cv2
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    owner = bus_owner(name)
+    if owner is not None:
+        print(f"ERROR: Frame bus '{name}' is already published by pid {owner}.", file=sys.stderr, flush=True)
+        return 1
+    cap = cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        print("ERROR: Could not open camera.", file=sys.stderr, flush=True)
+        return 1
+    pub = None
+    print(f"Frame bus '{name}' publishing camera {cam_index}.", flush=True)
+    try:
+        while running:
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            if pub is None:
+                try:
+                    pub = FramePublisher(name, frame.shape, slots)
+                except FrameBusBusy as e:
+                    print(f"ERROR: {e}.", file=sys.stderr, flush=True)
+                    return 1
+            pub.publish(frame)
+    finally:
+        cap.release()
+        if pub is not None:
+            pub.close()
+        print("Frame bus stopped.", flush=True)
+    return 0
+
+
+def preview(name):
+    """Show the bus in a window (latest frame only, never slows the publisher)"""
+    import cv2
+    sub = FrameSubscriber(name)
+    if not sub.isOpened():
+        print(f"ERROR: Frame bus '{name}' not found.", file=sys.stderr, flush=True)
+        return 1
+    try:
+        while True:
+            got = sub.wait(copy=False)
+            if got is None:
+                break
+            cv2.imshow(f"Frame bus: {name}", cv2.flip(got[2], 1))
+            if cv2.waitKey(1) & 0xFF == 27:  # ESC
+                break
+    finally:
+        sub.release()
+        cv2.destroyAllWindows()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory camera frame bus")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    pub = sub.add_parser("publish", help="Own the camera and publish frames")
+    pub.add_argument("--name", default=FRAME_BUS or "hci_frames")
+    pub.add_argument("--cam", type=int, default=int(os.getenv("CAM_INDEX", "0")))
+    pub.add_argument("--slots", type=int, default=FRAME_BUS_SLOTS)
+    prev = sub.add_parser("preview", help="Show the published frames in a window")
+    prev.add_argument("--name", default=FRAME_BUS or "hci_frames")
+    args = parser.parse_args()
+    if args.cmd == "preview":
+        return preview(args.name)
+    return publish_camera(args.name, args.cam, args.slots)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
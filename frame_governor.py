@@ -0,0 +1,138 @@
+"""
+Idle-aware frame rate governor for the Eye/Hand tracker loops.
+
+States:
+    active - landmarks in view and moving: run at ACTIVE_FPS (0 = camera rate)
+    idle   - landmarks in view but still for IDLE_AFTER_S: run at IDLE_FPS
+    absent - no landmarks for ABSENT_AFTER_S: run at ABSENT_FPS
+
+The first frame that shows presence/motion again switches straight back to
+active, so the next frame is already at full rate. Frame and process-CPU time
+are accounted per state and logged every GOVERNOR_LOG_S seconds. With
+CPU_BUDGET set (fraction of one core) the frame interval is stretched so the
+tracker's average CPU use stays under budget in every state.
+
+    gov = FrameGovernor("eye")
+    while running:
+        gov.wait()
+        ok, frame = cap.read()
+        ...
+        gov.update(present=bool(landmarks), motion=pointer_delta)
+"""
+
+import os
+import time
+
+# ========= Governor settings (env overrides) =========
+GOVERNOR_ENABLED = os.getenv("GOVERNOR_ENABLED", "1") == "1"
+ACTIVE_FPS = float(os.getenv("ACTIVE_FPS", "0"))           # 0 = as fast as the camera delivers
+IDLE_FPS = float(os.getenv("IDLE_FPS", "12"))
+ABSENT_FPS = float(os.getenv("ABSENT_FPS", "5"))
+IDLE_MOTION = float(os.getenv("IDLE_MOTION", "0.003"))     # normalized per-frame motion counted as "still"
+IDLE_AFTER_S = float(os.getenv("IDLE_AFTER_S", "5.0"))
+ABSENT_AFTER_S = float(os.getenv("ABSENT_AFTER_S", "1.0"))
+CPU_BUDGET = float(os.getenv("CPU_BUDGET", "0"))           # fraction of one core, 0 = unlimited
+GOVERNOR_LOG_S = float(os.getenv("GOVERNOR_LOG_S", "60"))  # 0 = no periodic log
+
+STATES = ("active", "idle", "absent")
+
+
+class _StateStats:
+    __slots__ = ("frames", "wall", "cpu")
+
+    def __init__(self):
+        self.frames = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class FrameGovernor:
+    def __init__(self, name="tracker", enabled=None, log=print,
+                 clock=time.perf_counter, cpu_clock=time.process_time, sleep=time.sleep):
+        self.name = name
+        self.enabled = GOVERNOR_ENABLED if enabled is None else enabled
+        self.state = "active"
+        self._log = log
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._sleep = sleep
+        self._fps = {"active": ACTIVE_FPS, "idle": IDLE_FPS, "absent": ABSENT_FPS}
+
+        now = clock()
+        self._last_start = now         # when the current frame was let through
+        self._last_seen = now          # last frame with landmarks
+        self._last_motion = now        # last frame with motion above IDLE_MOTION
+        self._mark_wall = now
+        self._mark_cpu = cpu_clock()
+        self._last_log = now
+        self._stats = {s: _StateStats() for s in STATES}
+        self._cpu_per_frame = 0.0      # EMA of process CPU seconds per frame
+
+    def interval(self, state=None):
+        """Target seconds between frames for `state` (budget-adjusted)"""
+        fps = self._fps[state or self.state]
+        base = 1.0 / fps if fps > 0 else 0.0
+        if CPU_BUDGET > 0 and self._cpu_per_frame > 0:
+            base = max(base, self._cpu_per_frame / CPU_BUDGET)
+        return base
+
+    def wait(self):
+        """Sleep until the next frame is due in the current state"""
+        if not self.enabled:
+            return
+        due = self._last_start + self.interval()
+        delay = due - self._clock()
+        if delay > 0:
+            self._sleep(delay)
+        self._last_start = self._clock()
+
+    def update(self, present, motion=0.0):
+        """Account the frame just processed and pick the state for the next one"""
+        now = self._clock()
+        cpu = self._cpu_clock()
+        st = self._stats[self.state]
+        st.frames += 1
+        st.wall += now - self._mark_wall
+        frame_cpu = cpu - self._mark_cpu
+        st.cpu += frame_cpu
+        self._cpu_per_frame += 0.2 * (frame_cpu - self._cpu_per_frame)
+        self._mark_wall, self._mark_cpu = now, cpu
+
+        if present:
+            self._last_seen = now
+            if motion > IDLE_MOTION:
+                self._last_motion = now
+
+        prev = self.state
+        if present and self._last_motion == now:
+            self.state = "active"      # any activity: full rate from the next frame
+        elif not present and now - self._last_seen >= ABSENT_AFTER_S:
+            self.state = "absent"
+        elif present and now - self._last_motion >= IDLE_AFTER_S:
+            self.state = "idle"
+        elif present and prev == "absent":
+            self.state = "active"
+
+        if self._log and prev != self.state:
+            self._log(f"{self.name} governor: {prev} -> {self.state}", flush=True)
+        if self._log and GOVERNOR_LOG_S > 0 and now - self._last_log >= GOVERNOR_LOG_S:
+            self._log(self.report(), flush=True)
+            self._last_log = now
+        return self.state
+
+    def stats(self):
+        """Per-state {frames, seconds, fps, cpu_pct} since start"""
+        out = {}
+        for s, st in self._stats.items():
+            out[s] = {
+                "frames": st.frames,
+                "seconds": round(st.wall, 2),
+                "fps": round(st.frames / st.wall, 1) if st.wall > 0 else 0.0,
+                "cpu_pct": round(100.0 * st.cpu / st.wall, 1) if st.wall > 0 else 0.0,
+            }
+        return out
+
+    def report(self):
+        parts = [f"{s} {v['fps']}fps cpu {v['cpu_pct']}% ({v['seconds']}s)"
+                 for s, v in self.stats().items() if v["frames"]]
+        return f"{self.name} governor: " + " | ".join(parts)
@@ -0,0 +1,484 @@
+"""
+Per-user gaze calibration for the eye tracker.
+
+Mapping iris landmark 476 straight to the screen only uses the few percent
+of the frame the iris actually moves across. Calibration instead shows a
+grid of targets, collects gaze features while the user looks at each one
+and fits a quadratic polynomial (least squares, small ridge) from features
+to normalized screen coordinates:
+
+    features  iris centre relative to the eye corners (u, v), normalized by
+              eye width, plus the nose tip position (head pose); without iris
+              refinement (lite profile) only the nose tip
+    mapping   screen = W . [1, z, z_i * z_j]   with z the standardized features
+
+The fit is stored per user as CALIB_DIR/<GAZE_PROFILE>.json. At runtime
+GazeMapper evaluates it with precomputed index arrays - a handful of
+vector ops per frame.
+
+    python gaze_calibration.py calibrate                 # 3x3 grid, saves GAZE_PROFILE
+    python gaze_calibration.py test --record run.jsonl   # random targets, records landmarks + targets
+    python gaze_calibration.py replay --stream run.jsonl # target acquisition time, raw vs calibrated
+    python gaze_calibration.py replay --synthetic        # same on a generated stream (raw mapping)
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# ========= Calibration settings (env overrides) =========
+CALIB_DIR = Path(os.getenv("CALIB_DIR", Path(__file__).resolve().parent / "calibration"))
+GAZE_PROFILE = os.getenv("GAZE_PROFILE", "default")
+CALIB_GRID = int(os.getenv("CALIB_GRID", "3"))                # targets per side
+CALIB_MARGIN = float(os.getenv("CALIB_MARGIN", "0.08"))       # outer targets this far from the edge
+CALIB_SETTLE_S = float(os.getenv("CALIB_SETTLE_S", "0.8"))    # ignore samples while the eye travels
+CALIB_SAMPLE_S = float(os.getenv("CALIB_SAMPLE_S", "1.2"))
+CALIB_RIDGE = float(os.getenv("CALIB_RIDGE", "1e-3"))
+ACQUIRE_RADIUS_PX = float(os.getenv("ACQUIRE_RADIUS_PX", "60"))
+ACQUIRE_HOLD_S = float(os.getenv("ACQUIRE_HOLD_S", "0.15"))   # must stay inside this long to count
+
+# Face mesh indices (left eye, as seen by the camera, with its iris ring 474..477)
+NOSE_TIP = 1
+EYE_OUTER, EYE_INNER = 263, 362
+IRIS_RING = [474, 475, 476, 477]
+GAZE_LANDMARKS = (NOSE_TIP, EYE_OUTER, EYE_INNER, *IRIS_RING)
+
+IRIS_FEATURES = ("iris_u", "iris_v", "nose_x", "nose_y")
+HEAD_FEATURES = ("nose_x", "nose_y")
+
+
+def feature_names(iris=True):
+    return IRIS_FEATURES if iris else HEAD_FEATURES
+
+
+def gaze_features(pts, out):
+    """Fill `out` (len 4 or 2, see feature_names) from an (N, 3) landmark array"""
+    if len(out) == len(IRIS_FEATURES):
+        outer, inner = pts[EYE_OUTER, :2], pts[EYE_INNER, :2]
+        width = max(float(np.hypot(*(outer - inner))), 1e-6)
+        out[:2] = (pts[IRIS_RING, :2].mean(axis=0) - (outer + inner) * 0.5) / width
+    out[-2:] = pts[NOSE_TIP, :2]
+    return out
+
+
+def _poly_pairs(n):
+    i, j = np.triu_indices(n)
+    return i, j
+
+
+def _design(z):
+    """[1, z, z_i*z_j (i <= j)] for every row of z"""
+    i, j = _poly_pairs(z.shape[1])
+    return np.hstack([np.ones((len(z), 1)), z, z[:, i] * z[:, j]])
+
+
+def fit_mapping(features, targets, ridge=None):
+    """
+    Least-squares quadratic map from features (n, k) to normalized screen
+    targets (n, 2). Returns the parameter dict GazeMapper takes.
+    """
+    X = np.asarray(features, dtype=np.float64)
+    Y = np.asarray(targets, dtype=np.float64)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale < 1e-9] = 1.0
+    A = _design((X - mean) / scale)
+    lam = np.sqrt(CALIB_RIDGE if ridge is None else ridge)
+    # Ridge via row augmentation; the constant term is not penalized
+    reg = lam * np.eye(A.shape[1])
+    reg[0, 0] = 0.0
+    W, *_ = np.linalg.lstsq(np.vstack([A, reg]), np.vstack([Y, np.zeros((A.shape[1], 2))]), rcond=None)
+    return {"mean": mean.tolist(), "scale": scale.tolist(), "weights": W.tolist()}
+
+
+class GazeMapper:
+    """Evaluates a fitted mapping: features -> normalized screen (x, y), clipped to the screen"""
+
+    def __init__(self, params, features=IRIS_FEATURES):
+        self.features = tuple(features)
+        self.mean = np.asarray(params["mean"], dtype=np.float64)
+        self.inv_scale = 1.0 / np.asarray(params["scale"], dtype=np.float64)
+        W = np.asarray(params["weights"], dtype=np.float64)
+        k = len(self.mean)
+        self.w0, self.w1, self.w2 = W[0], W[1:k + 1], W[k + 1:]
+        self._i, self._j = _poly_pairs(k)
+        self._z = np.empty(k)
+
+    def __call__(self, feat):
+        z = self._z
+        np.subtract(feat, self.mean, out=z)
+        z *= self.inv_scale
+        x, y = self.w0 + z @ self.w1 + (z[self._i] * z[self._j]) @ self.w2
+        return min(max(x, 0.0), 1.0), min(max(y, 0.0), 1.0)
+
+
+# ====== Per-user storage ======
+def profile_path(name=None):
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", str(name or GAZE_PROFILE))
+    return CALIB_DIR / f"{name}.json"
+
+
+def save_calibration(name, params, features, report, samples=None):
+    CALIB_DIR.mkdir(parents=True, exist_ok=True)
+    data = dict(params, features=list(features), report=report,
+                created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    if samples is not None:
+        data["samples"] = samples
+    path = profile_path(name)
+    path.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    return path
+
+
+def calibrated_profile(name=None):
+    """`name` if it has been calibrated, else "default" if that has (shared fallback), else None"""
+    for candidate in (name or GAZE_PROFILE, "default"):
+        if profile_path(candidate).exists():
+            return candidate
+    return None
+
+
+def load_mapper(name=None, iris=None):
+    """
+    GazeMapper for profile `name`, or None if it is missing or (with `iris`
+    given) was fitted on the other feature set
+    """
+    path = profile_path(name)
+    if not path.exists():
+        return None
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if iris is not None and tuple(data["features"]) != feature_names(iris):
+        print(f"Gaze calibration {path.name} was fitted on {data['features']}; ignoring it "
+              f"(recalibrate with this TRACKER_PROFILE)", flush=True)
+        return None
+    return GazeMapper(data, data["features"])
+
+
+def grid_targets(n=None, margin=None):
+    n = n or CALIB_GRID
+    margin = CALIB_MARGIN if margin is None else margin
+    axis = np.linspace(margin, 1.0 - margin, n)
+    return [(float(x), float(y)) for y in axis for x in axis]
+
+
+def fit_report(features, targets, groups, screen, ridge=None):
+    """Training error and leave-one-target-out error in pixels"""
+    X, Y, G = np.asarray(features), np.asarray(targets), np.asarray(groups)
+    wh = np.asarray(screen, dtype=np.float64)
+
+    def err(params, Xs, Ys):
+        m = GazeMapper(params, ())
+        pred = np.array([m(f) for f in Xs])
+        return np.hypot(*((pred - Ys) * wh).T)
+
+    train = err(fit_mapping(X, Y, ridge), X, Y)
+    held = []
+    for g in np.unique(G):
+        mask = G == g
+        if np.unique(G[~mask]).size >= 6:
+            held.append(np.median(err(fit_mapping(X[~mask], Y[~mask], ridge), X[mask], Y[mask])))
+    return {
+        "samples": int(len(X)),
+        "train_px": round(float(np.median(train)), 1),
+        "holdout_px": round(float(np.median(held)), 1) if held else None,
+    }
+
+
+# ====== Interactive calibration / test ======
+def _open_tracker():
+    import cv2
+    from cursor_actuator import make_backend
+    from frame_bus import open_capture
+    from landmark_features import EYE_TRACKER_LANDMARKS, LandmarkArray
+    from landmark_stream import FACE_LANDMARKS
+    from tracker_profiles import apply_threads, get_profile, make_face_mesh
+
+    cap = open_capture(int(os.getenv("CAM_INDEX", "0")))
+    if not cap.isOpened():
+        print("ERROR: Could not open camera.", file=sys.stderr, flush=True)
+        return None
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    profile = get_profile()
+    apply_threads(profile)
+    backend = make_backend()
+    screen = backend.size()
+    backend.close()
+    arr = LandmarkArray(FACE_LANDMARKS, EYE_TRACKER_LANDMARKS + GAZE_LANDMARKS)
+    return cap, make_face_mesh(profile), profile, arr, screen
+
+
+def _show_target(win, screen, target, label):
+    import cv2
+    sw, sh = screen
+    canvas = np.zeros((sh, sw, 3), dtype=np.uint8)
+    c = (int(target[0] * sw), int(target[1] * sh))
+    cv2.circle(canvas, c, 18, (255, 255, 255), 2)
+    cv2.circle(canvas, c, 4, (0, 0, 255), -1)
+    cv2.putText(canvas, label, (20, sh - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (200, 200, 200), 2, cv2.LINE_AA)
+    cv2.imshow(win, canvas)
+
+
+def _fullscreen(win):
+    import cv2
+    cv2.namedWindow(win, cv2.WND_PROP_FULLSCREEN)
+    cv2.setWindowProperty(win, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
+
+def calibrate(name):
+    import cv2
+    from landmark_features import eyelid_gap
+    from tracker_profiles import inference_input
+
+    opened = _open_tracker()
+    if opened is None:
+        return 1
+    cap, face_mesh, profile, arr, screen = opened
+    iris = profile["refine_landmarks"]
+    feat = np.zeros(len(feature_names(iris)))
+    blink_gap = float(os.getenv("BLINK_GAP_THRESH", "0.004"))
+    features, targets, groups = [], [], []
+    win = "Gaze calibration"
+    _fullscreen(win)
+    targets_grid = grid_targets()
+    try:
+        for k, target in enumerate(targets_grid):
+            _show_target(win, screen, target, f"Look at the dot ({k + 1}/{len(targets_grid)}) - ESC cancels")
+            start = time.monotonic()
+            while time.monotonic() - start < CALIB_SETTLE_S + CALIB_SAMPLE_S:
+                if cv2.waitKey(1) & 0xFF == 27:
+                    print("Calibration cancelled.", flush=True)
+                    return 1
+                ok, frame = cap.read()
+                if not ok or time.monotonic() - start < CALIB_SETTLE_S:
+                    continue
+                rgb = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+                out = face_mesh.process(inference_input(rgb, profile))
+                if not out.multi_face_landmarks:
+                    continue
+                pts = arr.update(out.multi_face_landmarks[0].landmark)
+                if eyelid_gap(pts) < blink_gap:
+                    continue
+                features.append(gaze_features(pts, feat).tolist())
+                targets.append(target)
+                groups.append(k)
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+
+    if len(set(groups)) < len(targets_grid):
+        print(f"ERROR: No face samples for {len(targets_grid) - len(set(groups))} target(s); "
+              f"check lighting and try again.", file=sys.stderr, flush=True)
+        return 1
+    params = fit_mapping(features, targets)
+    report = dict(fit_report(features, targets, groups, screen), screen=list(screen), profile=profile["name"])
+    path = save_calibration(name, params, feature_names(iris), report,
+                            {"features": features, "targets": targets, "groups": groups})
+    print(f"Saved {path}: {report['samples']} samples, median error {report['train_px']}px "
+          f"(held-out target {report['holdout_px']}px)", flush=True)
+    return 0
+
+
+def record_test(out_path, n_targets, hold_s, seed):
+    """Show random targets while recording landmarks; target schedule goes to <out>.targets.json"""
+    import cv2
+    from landmark_stream import LandmarkRecorder
+    from tracker_profiles import inference_input
+
+    opened = _open_tracker()
+    if opened is None:
+        return 1
+    cap, face_mesh, profile, _, screen = opened
+    rng = random.Random(seed)
+    recorder = LandmarkRecorder(out_path)
+    schedule = []
+    win = "Gaze test"
+    _fullscreen(win)
+    try:
+        for k in range(n_targets):
+            target = (rng.uniform(CALIB_MARGIN, 1 - CALIB_MARGIN), rng.uniform(CALIB_MARGIN, 1 - CALIB_MARGIN))
+            _show_target(win, screen, target, f"Target {k + 1}/{n_targets}")
+            cv2.waitKey(1)
+            onset = time.perf_counter()
+            schedule.append([onset, target[0] * screen[0], target[1] * screen[1]])
+            while time.perf_counter() - onset < hold_s:
+                if cv2.waitKey(1) & 0xFF == 27:
+                    return 1
+                ok, frame = cap.read()
+                if not ok:
+                    continue
+                t = time.perf_counter()
+                rgb = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+                out = face_mesh.process(inference_input(rgb, profile))
+                recorder.write(t, out.multi_face_landmarks[0].landmark if out.multi_face_landmarks else None)
+    finally:
+        recorder.close()
+        cap.release()
+        cv2.destroyAllWindows()
+        Path(_targets_path(out_path)).write_text(
+            json.dumps({"screen": list(screen), "profile": profile["name"], "targets": schedule}), encoding="utf-8")
+    print(f"Recorded {out_path} with {len(schedule)} targets", flush=True)
+    return 0
+
+
+def _targets_path(stream_path):
+    return str(Path(stream_path).with_suffix("")) + ".targets.json"
+
+
+# ====== Target acquisition on replays ======
+def acquisition_times(cursor, targets, radius_px=None, hold_s=None, timeout_s=3.0):
+    """
+    Seconds from each target's onset until the cursor enters `radius_px` of it
+    and stays `hold_s`; None if it never does before the next target / timeout.
+    cursor: [(t, x, y)], targets: [(onset_t, x, y)] in screen pixels.
+    """
+    radius = ACQUIRE_RADIUS_PX if radius_px is None else radius_px
+    hold = ACQUIRE_HOLD_S if hold_s is None else hold_s
+    c = np.asarray(cursor, dtype=np.float64).reshape(-1, 3)
+    times = []
+    for k, (onset, tx, ty) in enumerate(targets):
+        end = onset + timeout_s
+        if k + 1 < len(targets):
+            end = min(end, targets[k + 1][0])
+        win = c[(c[:, 0] >= onset) & (c[:, 0] < end)]
+        inside = np.hypot(win[:, 1] - tx, win[:, 2] - ty) <= radius
+        result, entered = None, None
+        for t, ok in zip(win[:, 0], inside):
+            if not ok:
+                entered = None
+            elif entered is None:
+                entered = t
+            if entered is not None and t - entered >= hold:
+                result = entered - onset
+                break
+        times.append(result)
+    return times
+
+
+def acquisition_summary(times):
+    hit = sorted(t for t in times if t is not None)
+    if not hit:
+        return {"targets": len(times), "hit_rate": 0.0, "median_s": None, "p90_s": None}
+    return {
+        "targets": len(times),
+        "hit_rate": round(len(hit) / len(times), 3),
+        "median_s": round(hit[len(hit) // 2], 3),
+        "p90_s": round(hit[min(int(len(hit) * 0.9), len(hit) - 1)], 3),
+    }
+
+
+def targets_from_truth(frames, truth, screen, eps=1e-6):
+    """Targets of a synthetic stream: each fixation, with onset when the move towards it starts"""
+    sw, sh = screen
+    targets = []
+    onset = None
+    for i in range(1, len(truth)):
+        moving = abs(truth[i][0] - truth[i - 1][0]) > eps or abs(truth[i][1] - truth[i - 1][1]) > eps
+        if moving and onset is None:
+            onset = frames[i - 1][0]
+        elif not moving and onset is not None:
+            targets.append((onset, truth[i][0] * sw, truth[i][1] * sh))
+            onset = None
+    return targets
+
+
+def replay_cursor(frames, screen, mapper=None, cursor_filter="one_euro", pointer=None):
+    """
+    Eye tracker cursor path [(t, x, y)] for a landmark stream, from the
+    tracker's own step: raw `pointer` landmark (default the one the stream
+    was recorded with) or through `mapper`
+    """
+    from tracker_steps import replay_stream
+
+    cursor = []
+
+    def on_frame(t, step, pts):
+        if pts is not None:
+            cursor.append((t,) + step.cursor)
+
+    replay_stream(frames, "eye", screen, cursor_filter, gaze_mapper=mapper, pointer=pointer, on_frame=on_frame)
+    return cursor
+
+
+def _recorded_iris(meta, frames):
+    """Whether a `test` run was recorded with iris landmarks: its tracker profile, else the landmark count"""
+    from landmark_stream import stream_has_iris
+    from tracker_profiles import get_profile
+
+    if meta.get("profile"):
+        return get_profile(meta["profile"], env=False)["refine_landmarks"]
+    return stream_has_iris(frames)
+
+
+def replay_report(args):
+    from landmark_stream import load_stream, synthetic_stream
+    from tracker_profiles import face_pointer_index
+
+    screen = tuple(int(v) for v in args.screen.lower().split("x"))
+    pointer = None
+    if args.synthetic:
+        frames, truth = synthetic_stream("eye", seconds=args.seconds)
+        targets = targets_from_truth(frames, truth, screen)
+        runs = {"raw": None}
+    else:
+        frames = load_stream(args.stream)
+        meta = json.loads(Path(args.targets or _targets_path(args.stream)).read_text(encoding="utf-8"))
+        screen = tuple(meta.get("screen", screen))
+        targets = meta["targets"]
+        # Point and map the way the recording tracker did (lite streams have no iris)
+        iris = _recorded_iris(meta, frames)
+        pointer = face_pointer_index({"refine_landmarks": iris})
+        runs = {"raw": None}
+        mapper = load_mapper(args.profile, iris=iris)
+        if mapper is not None:
+            runs["calibrated"] = mapper
+
+    results = {}
+    for label, mapper in runs.items():
+        cursor = replay_cursor(frames, screen, mapper, args.filter, pointer)
+        results[label] = acquisition_summary(acquisition_times(cursor, targets, args.radius))
+    print(f"{'mapping':<11} {'targets':>7} {'hit':>6} {'median_s':>9} {'p90_s':>7}")
+    for label, r in results.items():
+        print(f"{label:<11} {r['targets']:>7} {r['hit_rate']:>6} {r['median_s']!s:>9} {r['p90_s']!s:>7}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user gaze calibration")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    cal = sub.add_parser("calibrate", help="Look at a grid of targets and fit the gaze mapping")
+    cal.add_argument("--profile", default=GAZE_PROFILE, help="Calibration name (default GAZE_PROFILE)")
+
+    test = sub.add_parser("test", help="Record a target-acquisition run")
+    test.add_argument("--record", required=True, help="Landmark stream to write")
+    test.add_argument("--targets", type=int, default=12)
+    test.add_argument("--hold-s", type=float, default=2.5)
+    test.add_argument("--seed", type=int, default=0)
+
+    rep = sub.add_parser("replay", help="Target acquisition time on a recorded or synthetic run")
+    src = rep.add_mutually_exclusive_group(required=True)
+    src.add_argument("--stream", help="Stream recorded with `test`")
+    src.add_argument("--synthetic", action="store_true", help="Generated eye stream, raw mapping")
+    rep.add_argument("--targets", help="Target schedule (default <stream>.targets.json)")
+    rep.add_argument("--profile", default=GAZE_PROFILE)
+    rep.add_argument("--filter", default=os.getenv("CURSOR_FILTER", "one_euro"))
+    rep.add_argument("--radius", type=float, default=ACQUIRE_RADIUS_PX)
+    rep.add_argument("--screen", default="1920x1080")
+    rep.add_argument("--seconds", type=float, default=30.0)
+
+    args = parser.parse_args()
+    if args.cmd == "calibrate":
+        return calibrate(args.profile)
+    if args.cmd == "test":
+        return record_test(args.record, args.targets, args.hold_s, args.seed)
+    return replay_report(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+Table-driven temporal gesture engine for the trackers.
+
+Each frame the tracker pushes one row of named features (pinch distance,
+eyelid gap, cursor position, ...) into a fixed-size FeatureHistory ring.
+Gestures are declared as data: an enter predicate (and optional release
+predicate for hysteresis) over that history, which phases produce events,
+and timing windows. The engine evaluates the whole table in one pass per
+frame, so adding a gesture adds one predicate call, not another layer of
+branches in the tracker loop.
+
+    Gesture("click", when=pinch_closed, release=pinch_open, on=("end",),
+            max_s=0.9, blocked_by=("drag",), group="click", cooldown_s=0.25)
+
+Phases:
+    start  - predicate became true (with taps=N: only the N-th start within within_s)
+    end    - released; only if the active span is within [min_s, max_s)
+    repeat - every every_s while active; `track` reports the feature delta since the last one
+
+Gestures in the same `group` share a cooldown and fire at most once per
+frame (earlier table entries win); `blocked_by` suppresses a gesture while
+any of the named gestures is active.
+
+hand_gestures() / eye_gestures() build the tables Hand_Mouse / Eye_Mouse use;
+`python gesture_engine.py --stream rec.jsonl --kind hand` (or --synthetic)
+replays a landmark stream through them and prints the events.
+"""
+
+import argparse
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+# Frame rate the history is initially sized for; it grows if frames come faster
+GESTURE_MAX_FPS = float(os.getenv("GESTURE_MAX_FPS", "60"))
+
+GestureEvent = namedtuple("GestureEvent", "name phase t duration delta")
+
+PHASES = ("start", "end", "repeat")
+
+
+class FeatureHistory:
+    """
+    Preallocated ring of (t, feature...) rows with windowed, vectorized
+    queries. With `window_s` the ring doubles whenever it is full but spans
+    less than that, so time-window queries keep working at any frame rate.
+    """
+
+    def __init__(self, names, capacity=128, window_s=0.0):
+        self.names = tuple(names)
+        self.window_s = window_s
+        self.col = {n: i + 1 for i, n in enumerate(self.names)}
+        self.data = np.zeros((capacity, len(self.names) + 1), dtype=np.float64)
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+        self.t = 0.0
+        self._offsets = np.arange(capacity)
+
+    def _grow(self):
+        order = (self.head + np.arange(self.capacity)) % self.capacity   # oldest first
+        data = np.zeros((self.capacity * 2, self.data.shape[1]), dtype=np.float64)
+        data[:self.capacity] = self.data[order]
+        self.data = data
+        self.head = self.count
+        self.capacity *= 2
+        self._offsets = np.arange(self.capacity)
+
+    def push(self, t, row):
+        if (self.count == self.capacity and self.window_s > 0
+                and self.data[self.head, 0] > t - self.window_s):
+            self._grow()
+        self.data[self.head, 0] = t
+        self.data[self.head, 1:] = row
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        self.t = t
+
+    def clear(self):
+        self.head = self.count = 0
+
+    def __getitem__(self, name):
+        """Newest value of feature `name`"""
+        return self.data[(self.head - 1) % self.capacity, self.col[name]]
+
+    def _last(self, frames):
+        k = min(frames, self.count)
+        return self.data[(self.head - 1 - self._offsets[:k]) % self.capacity]
+
+    def count_below(self, name, thresh, frames):
+        """How many of the last `frames` values of `name` are below `thresh`"""
+        return int(np.count_nonzero(self._last(frames)[:, self.col[name]] < thresh))
+
+    def spread(self, names, seconds):
+        """
+        Max distance of the `names` point from its mean over the last `seconds`;
+        inf until the history actually covers that long.
+        """
+        rows = self.data[:self.count]
+        if self.count == 0 or rows[:, 0].min() > self.t - seconds:
+            return math.inf
+        pts = rows[rows[:, 0] >= self.t - seconds][:, [self.col[n] for n in names]]
+        d = pts - pts.mean(axis=0)
+        return float(np.sqrt(np.max(np.einsum("ij,ij->i", d, d))))
+
+
+class Gesture:
+    def __init__(self, name, when, release=None, on=("start",), min_s=0.0, max_s=math.inf,
+                 every_s=None, taps=1, within_s=math.inf, blocked_by=(), group=None,
+                 cooldown_s=0.0, track=None, window_s=0.0):
+        unknown = set(on) - set(PHASES)
+        if unknown:
+            raise ValueError(f"Gesture '{name}': unknown phase(s) {sorted(unknown)}")
+        if "repeat" in on and not every_s:
+            raise ValueError(f"Gesture '{name}': 'repeat' needs every_s")
+        self.name = name
+        self.when = when
+        self.release = release
+        self.on = tuple(on)
+        self.min_s = min_s
+        self.max_s = max_s
+        self.every_s = every_s
+        self.taps = taps
+        self.within_s = within_s
+        self.blocked_by = tuple(blocked_by)
+        self.group = group
+        self.cooldown_s = cooldown_s
+        self.track = track
+        self.window_s = window_s   # history `when` looks back over (sizes the FeatureHistory)
+
+
+class _GestureState:
+    __slots__ = ("active", "start_t", "last_fire", "ref", "tap_times")
+
+    def __init__(self):
+        self.active = False
+        self.start_t = 0.0
+        self.last_fire = 0.0
+        self.ref = 0.0
+        self.tap_times = []
+
+
+class GestureEngine:
+    def __init__(self, features, gestures, capacity=128, max_fps=None):
+        self.gestures = list(gestures)
+        window_s = max((g.window_s for g in self.gestures), default=0.0)
+        capacity = max(capacity, int(math.ceil(window_s * (max_fps or GESTURE_MAX_FPS))) + 2)
+        self.history = FeatureHistory(features, capacity, window_s)
+        names = [g.name for g in self.gestures]
+        if len(set(names)) != len(names):
+            raise ValueError("Gesture names must be unique")
+        for g in self.gestures:
+            unknown = set(g.blocked_by) - set(names)
+            if unknown:
+                raise ValueError(f"Gesture '{g.name}': blocked_by unknown gesture(s) {sorted(unknown)}")
+        self._state = {g.name: _GestureState() for g in self.gestures}
+        self._group_last = {}
+
+    def active(self, name):
+        return self._state[name].active
+
+    def clear_history(self):
+        """Forget feature history (e.g. landmarks lost) but keep gesture states such as an ongoing drag"""
+        self.history.clear()
+
+    def _fire(self, g, phase, t, duration, delta, fired_groups, events):
+        if any(self._state[b].active for b in g.blocked_by):
+            return False
+        if g.group is not None:
+            if g.group in fired_groups:
+                return False
+            if t - self._group_last.get(g.group, -math.inf) <= g.cooldown_s:
+                return False
+            fired_groups.add(g.group)
+            self._group_last[g.group] = t
+        events.append(GestureEvent(g.name, phase, t, duration, delta))
+        return True
+
+    def update(self, t, row):
+        """Push one feature row and evaluate every gesture; returns this frame's events"""
+        h = self.history
+        h.push(t, row)
+        events = []
+        fired_groups = set()
+        for g in self.gestures:
+            st = self._state[g.name]
+            if st.active:
+                released = g.release(h) if g.release is not None else not g.when(h)
+                if released:
+                    st.active = False
+                    dur = t - st.start_t
+                    if "end" in g.on and g.min_s <= dur < g.max_s:
+                        self._fire(g, "end", t, dur, None, fired_groups, events)
+                elif "repeat" in g.on and t - st.last_fire >= g.every_s:
+                    cur = h[g.track] if g.track else 0.0
+                    if self._fire(g, "repeat", t, t - st.start_t, cur - st.ref, fired_groups, events):
+                        st.last_fire, st.ref = t, cur
+            elif g.when(h):
+                st.active = True
+                st.start_t = st.last_fire = t
+                st.ref = h[g.track] if g.track else 0.0
+                if "start" in g.on:
+                    st.tap_times = [x for x in st.tap_times if t - x <= g.within_s]
+                    st.tap_times.append(t)
+                    if len(st.tap_times) >= g.taps:
+                        if self._fire(g, "start", t, 0.0, None, fired_groups, events) and g.taps > 1:
+                            st.tap_times = []
+        return events
+
+
+# ====== Gesture tables ======
+HAND_FEATURES = ("pinch", "index_ext", "middle_ext", "cursor_y")
+EYE_FEATURES = ("gap", "cursor_x", "cursor_y", "gaze_y")
+
+
+def hand_gestures(pinch_close=0.04, pinch_release=0.055, hold_right_s=0.9, finger_ext=0.2,
+                  click_cooldown=0.25, scroll=True, scroll_every_s=0.04, drag=True):
+    """Hand_Mouse: spread drag, pinch click / hold right-click, pinch + vertical move scroll"""
+    def pinched(h):
+        return h["pinch"] < pinch_close
+
+    def unpinched(h):
+        return h["pinch"] > pinch_release
+
+    table = []
+    blocked_by = ()
+    if drag:
+        table.append(Gesture("drag", on=("start", "end"),
+                             when=lambda h: h["index_ext"] > finger_ext and h["middle_ext"] > finger_ext))
+        blocked_by = ("drag",)
+    table += [
+        Gesture("right_click", when=pinched, release=unpinched, on=("end",), min_s=hold_right_s,
+                blocked_by=blocked_by, group="click", cooldown_s=click_cooldown),
+        Gesture("click", when=pinched, release=unpinched, on=("end",), max_s=hold_right_s,
+                blocked_by=blocked_by, group="click", cooldown_s=click_cooldown),
+    ]
+    if scroll:
+        table.append(Gesture("scroll", when=pinched, release=unpinched, on=("repeat",),
+                             every_s=scroll_every_s, blocked_by=blocked_by, track="cursor_y"))
+    return table
+
+
+def eye_gestures(blink_gap=0.004, blink_frames=2, blink_window=5, double_window_s=0.8,
+                 click_cooldown=0.25, dwell=True, dwell_s=1.0, dwell_radius_px=30,
+                 edge_scroll=True, edge_margin=0.08, scroll_every_s=0.06):
+    """Eye_Mouse: blink click, double-blink double-click, dwell click, edge scroll"""
+    def blinking(h):
+        return h.count_below("gap", blink_gap, blink_window) >= blink_frames
+
+    table = [
+        # Listed before "blink": the second blink in the window becomes a double-click instead
+        Gesture("double_blink", when=blinking, taps=2, within_s=double_window_s,
+                group="click", cooldown_s=click_cooldown),
+        Gesture("blink", when=blinking, group="click", cooldown_s=click_cooldown),
+    ]
+    if dwell:
+        table.append(Gesture("dwell", on=("start", "repeat"), every_s=dwell_s, window_s=dwell_s,
+                             when=lambda h: h.spread(("cursor_x", "cursor_y"), dwell_s) <= dwell_radius_px,
+                             group="click", cooldown_s=click_cooldown))
+    if edge_scroll:
+        table += [
+            Gesture("edge_up", when=lambda h: h["gaze_y"] < edge_margin,
+                    on=("start", "repeat"), every_s=scroll_every_s),
+            Gesture("edge_down", when=lambda h: h["gaze_y"] > 1.0 - edge_margin,
+                    on=("start", "repeat"), every_s=scroll_every_s),
+        ]
+    return table
+
+
+# ====== Replay ======
+def replay(frames, kind, screen=(1920, 1080), cursor_filter="one_euro", gestures=None):
+    """
+    Run a landmark stream through the tracker's own step (tracker_steps.py) on
+    stream time; returns (events, calls): the gesture events and the actuator's
+    (t, action, args) backend calls. A custom `gestures` table must use the
+    tracker's gesture names.
+    """
+    from tracker_steps import replay_stream
+    return replay_stream(frames, kind, screen, cursor_filter, gestures)
+
+
+def main():
+    from landmark_stream import load_stream, synthetic_stream
+
+    parser = argparse.ArgumentParser(description="Replay a landmark stream through the gesture tables")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--stream", help="Recorded landmark stream (JSON lines)")
+    src.add_argument("--synthetic", choices=["eye", "hand"], help="Use a generated stream")
+    parser.add_argument("--kind", choices=["eye", "hand"], default="hand")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        kind = args.synthetic
+        frames, _ = synthetic_stream(kind)
+    else:
+        kind = args.kind
+        frames = load_stream(args.stream)
+    events, calls = replay(frames, kind)
+    for ev in events:
+        extra = f" held={ev.duration:.2f}s" if ev.phase == "end" else ""
+        extra += f" delta={ev.delta:.1f}" if ev.delta is not None else ""
+        print(f"{ev.t:8.3f}  {ev.name:<13} {ev.phase}{extra}")
+    actions = [c for c in calls if c[1] != "move"]
+    for t, action, call_args in actions:
+        print(f"{t:8.3f}  -> {action}{call_args}")
+    moves = len(calls) - len(actions)
+    print(f"{len(events)} events, {len(actions)} actions + {moves} moves over {len(frames)} frames")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
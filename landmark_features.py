@@ -0,0 +1,126 @@
+"""
+NumPy landmark arrays and per-frame gesture features for the trackers.
+
+MediaPipe landmarks are copied once per frame into a reused float32 (N, 3)
+array; every feature after that is a vectorized expression over it, so
+per-frame Python work stays flat no matter how many features are read.
+Feature history lives in `gesture_engine.FeatureHistory`.
+
+    arr = LandmarkArray(FACE_LANDMARKS, EYE_TRACKER_LANDMARKS)
+    pts = arr.update(face.landmark)       # (N, 3) view into the reused buffer
+    gap = eyelid_gap(pts)
+
+`python landmark_features.py` times conversion + features per frame on a
+synthetic stream.
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+
+from landmark_stream import FACE_LANDMARKS, HAND_LANDMARKS
+
+# Face mesh indices
+EYELID_LOWER, EYELID_UPPER = 145, 159
+IRIS = slice(474, 478)
+NOSE_TIP = 1
+EYE_TRACKER_LANDMARKS = (NOSE_TIP, EYELID_LOWER, EYELID_UPPER, 474, 475, 476, 477)
+# Hand indices
+WRIST, THUMB_TIP, INDEX_TIP, MIDDLE_TIP = 0, 4, 8, 12
+FINGER_TIPS = np.array([INDEX_TIP, MIDDLE_TIP])
+
+
+class LandmarkArray:
+    """
+    Reused float32 (capacity, 3) buffer filled from MediaPipe landmarks or
+    (x, y, z) sequences. With `indices` only those rows are copied (the rest
+    stay zero) - the face mesh has 478 landmarks and the eye tracker reads a
+    handful, so this keeps conversion cost flat.
+    """
+
+    def __init__(self, capacity, indices=None):
+        self.data = np.zeros((capacity, 3), dtype=np.float32)
+        self._flat = self.data.reshape(-1)
+        self.indices = None if indices is None else np.asarray(sorted(set(indices)), dtype=np.intp)
+        self.n = 0
+
+    def update(self, landmarks):
+        n = len(landmarks)
+        if isinstance(landmarks[0], (tuple, list)):
+            # Recorded / synthetic streams
+            if self.indices is None:
+                self.data[:n] = landmarks
+            else:
+                idx = self.indices[self.indices < n]
+                self.data[idx] = [landmarks[i] for i in idx]
+        elif self.indices is None:
+            # One pass over the protobuf, straight into the reused buffer
+            self._flat[:n * 3] = np.fromiter(
+                itertools.chain.from_iterable((p.x, p.y, p.z) for p in landmarks),
+                dtype=np.float32, count=n * 3)
+        else:
+            sel = [landmarks[i] for i in self.indices if i < n]
+            self.data[self.indices[:len(sel)]] = np.fromiter(
+                itertools.chain.from_iterable((p.x, p.y, p.z) for p in sel),
+                dtype=np.float32, count=len(sel) * 3).reshape(-1, 3)
+        self.n = n
+        return self.data[:n]
+
+
+# ====== Features ======
+def eyelid_gap(pts):
+    """Lower minus upper eyelid y (image coords); small when the eye is closed"""
+    return float(pts[EYELID_LOWER, 1] - pts[EYELID_UPPER, 1])
+
+
+def pinch_distance(pts):
+    """Thumb tip to index tip distance (normalized image units)"""
+    d = pts[THUMB_TIP, :2] - pts[INDEX_TIP, :2]
+    return float(np.sqrt(np.dot(d, d)))
+
+
+def finger_extension(pts, tips=FINGER_TIPS):
+    """How far each fingertip in `tips` is above the wrist (positive = extended upward)"""
+    return pts[WRIST, 1] - pts[tips, 1]
+
+
+def step_size(cur, prev):
+    """Largest per-axis change between two feature vectors/points"""
+    return float(np.max(np.abs(np.subtract(cur, prev))))
+
+
+# ====== Micro benchmark ======
+def _bench(kind, frames, reps):
+    if kind == "eye":
+        arr = LandmarkArray(FACE_LANDMARKS, EYE_TRACKER_LANDMARKS)
+    else:
+        arr = LandmarkArray(HAND_LANDMARKS)
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        for _, lm in frames:
+            pts = arr.update(lm)
+            if kind == "eye":
+                eyelid_gap(pts)
+            else:
+                pinch_distance(pts)
+                finger_extension(pts)
+    n = reps * len(frames)
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main():
+    from landmark_stream import synthetic_stream
+
+    parser = argparse.ArgumentParser(description="Per-frame feature extraction cost")
+    parser.add_argument("--reps", type=int, default=5)
+    args = parser.parse_args()
+    for kind in ("eye", "hand"):
+        frames, _ = synthetic_stream(kind, seconds=5.0)
+        print(f"{kind}: {_bench(kind, frames, args.reps):.1f} us/frame")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
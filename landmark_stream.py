@@ -0,0 +1,135 @@
+"""
+Landmark stream recording / replay for the Eye and Hand trackers.
+
+A stream is a JSON-lines file, one line per processed camera frame:
+    {"t": 12.345, "lm": [[x, y, z], ...]}   # landmarks found
+    {"t": 12.378, "lm": null}               # nothing in view
+Coordinates are MediaPipe's normalized image coordinates (already mirrored).
+"""
+
+import json
+import random
+
+FACE_LANDMARKS = 478
+HAND_LANDMARKS = 21
+
+# Landmark that drives the cursor in each tracker
+POINTER_INDEX = {"eye": 476, "hand": 8}
+# Without iris refinement (lite profile) the face mesh has 468 landmarks and the eye tracker points with the nose tip
+NOSE_TIP = 1
+
+
+def stream_has_iris(frames):
+    """Whether face frames carry the iris landmarks; the first frame with a face decides (True if none has one)"""
+    return next((len(lm) >= FACE_LANDMARKS for _, lm in frames if lm is not None), True)
+
+
+def stream_pointer(kind, frames):
+    """Landmark the tracker that recorded `frames` pointed with"""
+    if kind == "eye" and not stream_has_iris(frames):
+        return NOSE_TIP
+    return POINTER_INDEX[kind]
+
+
+class LandmarkRecorder:
+    """Append landmark frames to a JSON-lines stream file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "w", encoding="utf-8")
+
+    def write(self, t, landmarks):
+        """Record one frame; `landmarks` is a MediaPipe landmark list, a sequence of (x, y, z) or None"""
+        if landmarks is None:
+            lm = None
+        else:
+            lm = [[round(float(p[0]), 6), round(float(p[1]), 6), round(float(p[2]), 6)]
+                  if isinstance(p, (list, tuple)) else
+                  [round(p.x, 6), round(p.y, 6), round(p.z, 6)]
+                  for p in landmarks]
+        self._fh.write(json.dumps({"t": round(t, 6), "lm": lm}, separators=(",", ":")) + "\n")
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+def load_stream(path):
+    """Load a recorded stream as a list of (t, [(x, y, z), ...] or None)"""
+    frames = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            lm = rec.get("lm")
+            frames.append((float(rec["t"]), [tuple(p) for p in lm] if lm is not None else None))
+    return frames
+
+
+def _min_jerk(s):
+    return s * s * s * (10 - 15 * s + 6 * s * s)
+
+
+def synthetic_stream(kind="eye", seconds=10.0, fps=30.0, noise=0.002, seed=0):
+    """
+    Generate a deterministic stream for `kind` ("eye" or "hand").
+
+    The pointer landmark alternates between fixations at random targets and
+    minimum-jerk moves between them; every landmark gets Gaussian noise of
+    `noise` (normalized units). Eye streams include periodic blinks, hand
+    streams periodic pinches. Returns (frames, truth) where truth is the
+    noise-free pointer position (x, y) for every frame.
+    """
+    rng = random.Random(seed)
+    n_points = FACE_LANDMARKS if kind == "eye" else HAND_LANDMARKS
+    pointer = POINTER_INDEX[kind]
+    move_s = 0.12 if kind == "eye" else 0.35      # saccades are fast, hands are not
+    n_frames = int(seconds * fps)
+
+    # Build a piecewise path of (start_t, end_t, from, to) segments
+    segments = []
+    t = 0.0
+    pos = (0.5, 0.5)
+    while t < seconds:
+        hold = rng.uniform(0.6, 1.5)
+        segments.append((t, t + hold, pos, pos))
+        t += hold
+        nxt = (rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8))
+        segments.append((t, t + move_s, pos, nxt))
+        t += move_s
+        pos = nxt
+
+    def path_at(ft):
+        for start, end, a, b in segments:
+            if start <= ft < end:
+                s = _min_jerk((ft - start) / (end - start)) if a != b else 0.0
+                return (a[0] + (b[0] - a[0]) * s, a[1] + (b[1] - a[1]) * s)
+        return segments[-1][3]
+
+    frames, truth = [], []
+    for i in range(n_frames):
+        ft = i / fps
+        px, py = path_at(ft)
+        pts = [[0.5 + rng.gauss(0, noise), 0.5 + rng.gauss(0, noise), rng.gauss(0, noise)]
+               for _ in range(n_points)]
+        pts[pointer] = [px + rng.gauss(0, noise), py + rng.gauss(0, noise), 0.0]
+
+        phase = ft % 3.0
+        if kind == "eye":
+            # Eyelid: 145 (lower) / 159 (upper); open gap ~0.012, closed ~0.001
+            gap = 0.001 if 1.0 <= phase < 1.1 else 0.012
+            pts[159] = [px, 0.45 + rng.gauss(0, noise / 4), 0.0]
+            pts[145] = [px, 0.45 + gap + rng.gauss(0, noise / 4), 0.0]
+        else:
+            # Wrist low, index tip at pointer, middle folded, thumb pinches for 0.2s every 3s
+            pts[0] = [px, min(py + 0.3, 1.0), 0.0]
+            pts[12] = [px + 0.03, min(py + 0.15, 1.0), 0.0]
+            off = 0.01 if 1.0 <= phase < 1.2 else 0.09
+            pts[4] = [px - off, py + off / 2, 0.0]
+
+        frames.append((ft, [tuple(p) for p in pts]))
+        truth.append((px, py))
+    return frames, truth
@@ -0,0 +1,477 @@
+"""
+Performance suite for the trackers and the web app; runs on a CPU-only box
+with no camera.
+
+    tracker   per-frame cost (us/frame) of each stage the trackers run after
+              inference - landmark conversion, cursor filters, gesture engine,
+              gaze mapping - on synthetic streams and any recorded ones
+    replay    end-to-end FPS of the trackers' own post-inference step
+              (tracker_steps.py: features, filter, actuator on the null
+              backend, gestures) plus the frame governor, on stream time
+    app       latency / throughput of app.py endpoints through Flask's test
+              client: auth, status and start/stop with stub tracker scripts
+              (EYE_SCRIPT / HAND_SCRIPT), on a throwaway database
+
+Results are JSON: {"meta": {...}, "metrics": {name: {value, unit, better}}}.
+
+    python perf_suite.py run --out results.json
+    python perf_suite.py run --stream eye=rec/eye1.jsonl --save-baseline
+    python perf_suite.py compare results.json     # vs benchmarks/baseline.json
+
+`compare` exits 1 when a metric is worse than the baseline by more than
+--threshold (default PERF_THRESHOLD, 15%).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent
+BASELINE = Path(os.getenv("PERF_BASELINE", ROOT / "benchmarks" / "baseline.json"))
+PERF_THRESHOLD = float(os.getenv("PERF_THRESHOLD", "0.15"))
+PERF_REPEATS = int(os.getenv("PERF_REPEATS", "5"))
+
+STUB_TRACKER = """\
+import signal, sys, time
+signal.signal(signal.SIGTERM, lambda *a: sys.exit(0))
+print("stub tracker started", flush=True)
+while True:
+    time.sleep(0.5)
+"""
+
+
+def _metric(value, unit, better, noise=None):
+    m = {"value": round(float(value), 3), "unit": unit, "better": better}
+    if noise is not None:
+        m["noise"] = round(float(noise), 3)
+    return m
+
+
+class Timing(float):
+    """Best-of-repeats seconds, with `noise` = relative spread (max - min) / 2 / best"""
+    noise = 0.0
+
+
+def _best_time(fn, repeats):
+    """
+    Fastest of `repeats` calls (after one warm-up call). On shared/virtual
+    CPUs the slow repeats are interference, not the code.
+    """
+    fn()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    best = Timing(min(times))
+    best.noise = (max(times) - best) / 2 / best if best > 0 else 0.0
+    return best
+
+
+def _per_frame(elapsed, n):
+    return _metric(elapsed / n * 1e6, "us/frame", "lower", elapsed.noise)
+
+
+def reference_score(repeats=5):
+    """
+    Microseconds for a fixed NumPy + pure-Python workload shaped like the
+    tracker loop. Measured right before each group of benchmarks and stored
+    with the tracker and replay metrics (`ref_us`) so `compare --normalize`
+    can factor out machine speed (CPU frequency scaling, noisy neighbours).
+    """
+    a = np.random.default_rng(0).random((478, 3), dtype=np.float32)
+    idx = np.arange(0, 478, 7)
+
+    def work():
+        acc = 0.0
+        for i in range(2000):
+            acc += float(np.max(np.abs(a[idx] - a[idx[::-1]]))) + (i % 7) * 0.5
+        return acc
+    return _best_time(work, repeats) / 2000 * 1e6
+
+
+# ====== Tracker per-frame stages ======
+def _landmark_array(kind):
+    from gaze_calibration import GAZE_LANDMARKS
+    from landmark_features import EYE_TRACKER_LANDMARKS, LandmarkArray
+    from landmark_stream import FACE_LANDMARKS, HAND_LANDMARKS
+    if kind == "eye":
+        return LandmarkArray(FACE_LANDMARKS, EYE_TRACKER_LANDMARKS + GAZE_LANDMARKS)
+    return LandmarkArray(HAND_LANDMARKS)
+
+
+def _synthetic_mapper():
+    """GazeMapper fitted on a synthetic 3x3 calibration, so its cost matches a real one"""
+    from gaze_calibration import GazeMapper, IRIS_FEATURES, fit_mapping, grid_targets
+    rng = np.random.default_rng(0)
+    features, targets = [], []
+    for x, y in grid_targets():
+        for _ in range(20):
+            features.append([(x - 0.5) * 0.4, (y - 0.5) * 0.25, 0.5, 0.5] + rng.normal(0, 0.004, 4))
+            targets.append((x, y))
+    return GazeMapper(fit_mapping(features, targets), IRIS_FEATURES)
+
+
+def _gesture_rows(kind, frames, screen):
+    """Feature rows the tracker's step pushes into its gesture engine, from a headless replay"""
+    from gesture_engine import EYE_FEATURES, HAND_FEATURES, GestureEngine, eye_gestures, hand_gestures
+    from tracker_steps import replay_stream
+
+    rows = []
+
+    class RowRecorder(GestureEngine):
+        def update(self, t, row):
+            rows.append((t, row.copy()))
+            return super().update(t, row)
+
+    engine = (RowRecorder(EYE_FEATURES, eye_gestures()) if kind == "eye"
+              else RowRecorder(HAND_FEATURES, hand_gestures()))
+    replay_stream(frames, kind, screen, gestures=engine)
+    return rows
+
+
+def bench_stages(kind, frames, label, repeats, screen=(1920, 1080)):
+    from cursor_filter import FILTER_KINDS, make_filter
+    from gaze_calibration import gaze_features
+    from gesture_engine import EYE_FEATURES, HAND_FEATURES, GestureEngine, eye_gestures, hand_gestures
+    from landmark_stream import stream_has_iris, stream_pointer
+
+    present = [(t, lm) for t, lm in frames if lm is not None]
+    n = len(present)
+    if n == 0:
+        return {}
+    pointer = stream_pointer(kind, present)
+    metrics = {}
+    prefix = f"tracker.{kind}.{label}"
+
+    arr = _landmark_array(kind)
+
+    def convert():
+        for _, lm in present:
+            arr.update(lm)
+    metrics[f"{prefix}.landmarks_us"] = _per_frame(_best_time(convert, repeats), n)
+
+    targets = [(t, lm[pointer][0] * screen[0], lm[pointer][1] * screen[1]) for t, lm in present]
+    for fk in FILTER_KINDS:
+        def run_filter():
+            f = make_filter(fk)
+            for t, x, y in targets:
+                f(x, y, t)
+        metrics[f"{prefix}.filter_{fk}_us"] = _per_frame(_best_time(run_filter, repeats), n)
+
+    rows = _gesture_rows(kind, present, screen)
+
+    def run_gestures():
+        engine = (GestureEngine(EYE_FEATURES, eye_gestures()) if kind == "eye"
+                  else GestureEngine(HAND_FEATURES, hand_gestures()))
+        for t, row in rows:
+            engine.update(t, row)
+    metrics[f"{prefix}.gestures_us"] = _per_frame(_best_time(run_gestures, repeats), n)
+
+    if kind == "eye" and stream_has_iris(present):
+        mapper = _synthetic_mapper()
+        feat = np.zeros(len(mapper.features))
+        pts_list = [arr.update(lm).copy() for _, lm in present]
+
+        def run_mapper():
+            for pts in pts_list:
+                mapper(gaze_features(pts, feat))
+        metrics[f"{prefix}.gaze_mapper_us"] = _per_frame(_best_time(run_mapper, repeats), n)
+    return metrics
+
+
+# ====== End-to-end replay ======
+def replay_loop(kind, frames, screen=(1920, 1080), cursor_filter="one_euro", mapper=None):
+    """
+    The trackers' own post-inference step (tracker_steps.py) and frame
+    governor over a stream, headless; returns frames processed. Both run on
+    stream time, so latency and governor states follow the recording.
+    """
+    from cursor_actuator import CursorActuator, NullBackend
+    from cursor_filter import make_filter
+    from frame_governor import FrameGovernor
+    from gesture_engine import EYE_FEATURES, HAND_FEATURES, GestureEngine, eye_gestures, hand_gestures
+    from landmark_stream import stream_pointer
+    from tracker_steps import EyeStep, HandStep
+
+    now = [frames[0][0] if frames else 0.0]
+
+    def clock():
+        return now[0]
+
+    actuator = CursorActuator(NullBackend(screen), threaded=False, clock=clock)
+    if kind == "eye":
+        step = EyeStep(actuator, make_filter(cursor_filter), GestureEngine(EYE_FEATURES, eye_gestures()),
+                       pointer=stream_pointer(kind, frames), gaze_mapper=mapper, clock=clock)
+    else:
+        step = HandStep(actuator, make_filter(cursor_filter), GestureEngine(HAND_FEATURES, hand_gestures()),
+                        clock=clock)
+    # Frames are replayed back to back; the governor still accounts and switches states
+    governor = FrameGovernor(kind, enabled=True, log=lambda *a, **kw: None, clock=clock, sleep=lambda s: None)
+
+    for t, lm in frames:
+        now[0] = t
+        governor.wait()
+        pts, motion = step(lm, t)
+        governor.update(present=pts is not None, motion=motion)
+    actuator.stop()
+    return len(frames)
+
+
+def bench_replay(kind, frames, label, repeats):
+    from landmark_stream import stream_has_iris
+
+    metrics = {}
+    elapsed = _best_time(lambda: replay_loop(kind, frames), repeats)
+    metrics[f"replay.{kind}.{label}.fps"] = _metric(len(frames) / elapsed, "frames/s", "higher", elapsed.noise)
+    if kind == "eye" and stream_has_iris(frames):
+        mapper = _synthetic_mapper()
+        elapsed = _best_time(lambda: replay_loop(kind, frames, mapper=mapper), repeats)
+        metrics[f"replay.{kind}.{label}.calibrated_fps"] = _metric(len(frames) / elapsed, "frames/s", "higher",
+                                                                   elapsed.noise)
+    return metrics
+
+
+# ====== App endpoints ======
+def _load_app(tmp):
+    """Import app.py against a scratch database, log dir and stub tracker scripts"""
+    stub = Path(tmp) / "stub_tracker.py"
+    stub.write_text(STUB_TRACKER, encoding="utf-8")
+    os.environ.update({
+        "DB_PATH": str(Path(tmp) / "bench.db"),
+        "LOG_DIR": str(Path(tmp) / "logs"),
+        "EYE_SCRIPT": str(stub),
+        "HAND_SCRIPT": str(stub),
+        "CAMERA_INDEXES": "0,1,2,3",
+        "MAX_TRACKERS": "4",
+    })
+    sys.modules.pop("app", None)
+    import app
+    return app
+
+
+def _latency_metrics(name, rounds, metrics):
+    """
+    p50 / p95 / throughput of request timings, best of `rounds` (lists of
+    seconds) like _best_time; noise = relative spread of the rounds
+    """
+    def stats(xs):
+        xs = sorted(xs)
+        return (xs[len(xs) // 2] * 1e3, xs[min(int(len(xs) * 0.95), len(xs) - 1)] * 1e3, len(xs) / sum(xs))
+
+    per_round = list(zip(*(stats(r) for r in rounds)))
+    for key, unit, better, vals in zip(("p50_ms", "p95_ms", "rps"), ("ms", "ms", "req/s"),
+                                       ("lower", "lower", "higher"), per_round):
+        if key == "p95_ms" and min(len(r) for r in rounds) < 50:
+            continue   # the tail of a few dozen samples is just their max
+        best, worst = (min(vals), max(vals)) if better == "lower" else (max(vals), min(vals))
+        metrics[f"{name}.{key}"] = _metric(best, unit, better, abs(worst - best) / 2 / best if best else 0.0)
+
+
+def bench_app(requests_n, repeats):
+    try:
+        import flask  # noqa: F401
+    except ImportError:
+        print("Skipping app benchmarks: flask is not installed", file=sys.stderr, flush=True)
+        return {}
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        app_mod = _load_app(tmp)
+        client = app_mod.app.test_client()
+
+        def request(method, url, **kw):
+            t0 = time.perf_counter()
+            r = getattr(client, method)(url, **kw)
+            elapsed = time.perf_counter() - t0
+            if r.status_code >= 500:
+                raise RuntimeError(f"{url} -> {r.status_code}: {r.get_data(as_text=True)}")
+            return elapsed
+
+        def timed(name, n, rounds, method, url, body=None, **kw):
+            """`rounds` rounds of n requests; body(i) -> JSON for the i-th request overall"""
+            samples = [[request(method, url, json=body(r * n + i) if body else None, **kw) for i in range(n)]
+                       for r in range(rounds)]
+            _latency_metrics(name, samples, metrics)
+
+        # Password hashing dominates signup/login (and is steady), so fewer of them
+        n_auth, auth_rounds = max(requests_n // 20, 5), min(repeats, 3)
+        timed("app.signup", n_auth, auth_rounds, "post", "/api/auth/signup",
+              body=lambda i: {"email": f"bench{i}@example.com", "password": "bench"})
+        timed("app.login", n_auth, auth_rounds, "post", "/api/auth/login",
+              body=lambda i: {"email": f"bench{i}@example.com", "password": "bench"})
+
+        token = client.post("/api/auth/login", json={"email": "bench0@example.com", "password": "bench"}
+                            ).get_json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        timed("app.me", requests_n, repeats, "get", "/api/auth/me", headers=headers)
+        timed("app.status", requests_n, repeats, "get", "/api/eye-mouse/status", headers=headers)
+
+        # Start/stop cycles spawn and SIGTERM a real (stub) process each time
+        cycles = max(requests_n // 10, 5)
+        start, stop = [[] for _ in range(repeats)], [[] for _ in range(repeats)]
+        try:
+            for r in range(repeats):
+                for _ in range(cycles):
+                    start[r].append(request("post", "/api/hand-mouse/start", headers=headers))
+                    stop[r].append(request("post", "/api/hand-mouse/stop", headers=headers))
+        finally:
+            client.post("/api/kill-all", headers=headers)
+        _latency_metrics("app.start", start, metrics)
+        _latency_metrics("app.stop", stop, metrics)
+    return metrics
+
+
+# ====== Run / compare ======
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_suite(streams, repeats, seconds, app_requests, sections):
+    from landmark_stream import load_stream, synthetic_stream
+
+    metrics = {}
+
+    def measured(group):
+        ref = round(float(reference_score()), 3)
+        for m in group.values():
+            m.setdefault("ref_us", ref)
+        metrics.update(group)
+
+    inputs = [(kind, "synthetic", synthetic_stream(kind, seconds=seconds)[0]) for kind in ("eye", "hand")]
+    for spec in streams:
+        kind, path = spec.split("=", 1)
+        inputs.append((kind, Path(path).stem, load_stream(path)))
+
+    for kind, label, frames in inputs:
+        if "tracker" in sections:
+            measured(bench_stages(kind, frames, label, repeats))
+        if "replay" in sections:
+            measured(bench_replay(kind, frames, label, repeats))
+    if "app" in sections:
+        # No reference: request cost is Flask, SQLite and process spawns, which it does not track
+        metrics.update(bench_app(app_requests, repeats))
+
+    return {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "repeats": repeats,
+            "streams": [f"{k}={label}" for k, label, _ in inputs],
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(current, baseline, threshold, normalize=False):
+    """
+    Rows of (name, base, cur, change, status); change > 0 always means worse.
+    With `normalize`, current values of metrics that carry a reference score
+    (tracker and replay, never app) are first scaled by the ratio of the
+    references measured next to them in each run. A metric regresses when
+    the change exceeds `threshold` plus twice the noise the baseline measured
+    for it, that allowance capped at `threshold` (so at most 2x `threshold`).
+    """
+    rows = []
+    base_m, cur_m = baseline["metrics"], current["metrics"]
+    for name in sorted(set(base_m) | set(cur_m)):
+        if name not in cur_m or name not in base_m:
+            rows.append((name, base_m.get(name, {}).get("value"), cur_m.get(name, {}).get("value"), None,
+                         "missing" if name not in cur_m else "new"))
+            continue
+        b, c = base_m[name]["value"], cur_m[name]["value"]
+        scale = 1.0
+        if (normalize and not name.startswith("app.")
+                and base_m[name].get("ref_us") and cur_m[name].get("ref_us")):
+            scale = cur_m[name]["ref_us"] / base_m[name]["ref_us"]
+        c = c / scale if base_m[name]["better"] == "lower" else c * scale
+        if b == 0:
+            change = 0.0
+        elif base_m[name]["better"] == "lower":
+            change = (c - b) / b
+        else:
+            change = (b - c) / b
+        limit = threshold + min(2 * base_m[name].get("noise", 0.0), threshold)
+        status = "REGRESSION" if change > limit else ("improved" if change < -limit else "ok")
+        rows.append((name, b, round(c, 3), change, status))
+    return rows
+
+
+def _print_metrics(metrics):
+    for name, m in metrics.items():
+        print(f"{name:<48} {m['value']:>12} {m['unit']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracker and web app performance suite")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks and write JSON results")
+    run.add_argument("--out", help="Results file (default: print only)")
+    run.add_argument("--save-baseline", action="store_true", help=f"Also write results to {BASELINE}")
+    run.add_argument("--stream", action="append", default=[], metavar="KIND=PATH",
+                     help="Recorded landmark stream to include, e.g. eye=rec/eye1.jsonl (repeatable)")
+    run.add_argument("--only", nargs="+", choices=["tracker", "replay", "app"], default=["tracker", "replay", "app"])
+    run.add_argument("--repeats", type=int, default=PERF_REPEATS)
+    run.add_argument("--seconds", type=float, default=20.0, help="Length of the synthetic streams")
+    run.add_argument("--app-requests", type=int, default=200)
+
+    cmp_ = sub.add_parser("compare", help="Flag regressions against a baseline")
+    cmp_.add_argument("results")
+    cmp_.add_argument("--baseline", default=str(BASELINE))
+    cmp_.add_argument("--threshold", type=float, default=PERF_THRESHOLD, help="Allowed relative slowdown")
+    cmp_.add_argument("--normalize", action="store_true",
+                      help="Scale tracker/replay values by the runs' reference scores (experimental)")
+
+    args = parser.parse_args()
+    if args.cmd == "run":
+        results = run_suite(args.stream, args.repeats, args.seconds, args.app_requests, args.only)
+        _print_metrics(results["metrics"])
+        for path in ([args.out] if args.out else []) + ([BASELINE] if args.save_baseline else []):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+            print(f"Wrote {path}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print(f"ERROR: Baseline {baseline_path} not found (create it with `run --save-baseline`)",
+              file=sys.stderr, flush=True)
+        return 2
+    current = json.loads(Path(args.results).read_text(encoding="utf-8"))
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    rows = compare(current, baseline, args.threshold, args.normalize)
+    if args.normalize:
+        print("Tracker and replay values are normalized by the machine speed measured next to them.")
+    print(f"{'metric':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, b, c, change, status in rows:
+        pct = f"{change * 100:+.1f}%" if change is not None else "-"
+        print(f"{name:<48} {b!s:>10} {c!s:>10} {pct:>8}  {status}")
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    missing = [r for r in rows if r[4] == "missing"]
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}", flush=True)
+    if missing:
+        # e.g. the app benchmarks silently produce nothing without Flask
+        print(f"{len(missing)} baseline metric(s) missing from the results", flush=True)
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Performance profiles for the MediaPipe models used by the trackers.
+
+TRACKER_PROFILE picks one of:
+    lite      - hands: model_complexity 0; face: no iris refinement (the eye
+                tracker then points with the nose tip, i.e. head pointing);
+                320px inference input, 2 inference threads
+    balanced  - the original settings (hands complexity 1 with detection
+                confidence 0.7, face with iris refinement and MediaPipe's
+                default 0.5, native input size)
+    accurate  - like balanced with stricter detection/tracking confidence,
+                so MediaPipe re-detects more often instead of drifting
+
+Single fields can be overridden with INFERENCE_WIDTH, INFERENCE_THREADS,
+MODEL_COMPLEXITY, REFINE_LANDMARKS, MIN_DETECTION_CONF (hands),
+MIN_FACE_DETECTION_CONF, MIN_TRACKING_CONF.
+
+MediaPipe's Python solutions don't expose an inference thread count, so
+`threads` only limits OpenCV's pool. CPU pinning is left to the launcher:
+with TRACKER_CPUS (e.g. "2,3", set per session by app.py) the process is
+pinned to those cores (Linux), which bounds the TFLite/XNNPACK workers too.
+
+Benchmark every profile on recorded clips:
+    python tracker_profiles.py record --out corpus/hand1.mp4 --seconds 20
+    python tracker_profiles.py bench --mode hand corpus/*.mp4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PROFILES = {
+    "lite": {
+        "model_complexity": 0,
+        "refine_landmarks": False,
+        "min_detection_confidence": 0.6,
+        "face_min_detection_confidence": 0.6,
+        "min_tracking_confidence": 0.5,
+        "input_width": 320,
+        "threads": 2,
+    },
+    "balanced": {
+        "model_complexity": 1,
+        "refine_landmarks": True,
+        "min_detection_confidence": 0.7,
+        "face_min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+        "input_width": 0,
+        "threads": 0,
+    },
+    "accurate": {
+        "model_complexity": 1,
+        "refine_landmarks": True,
+        "min_detection_confidence": 0.8,
+        "face_min_detection_confidence": 0.7,
+        "min_tracking_confidence": 0.7,
+        "input_width": 0,
+        "threads": 0,
+    },
+}
+
+TRACKER_PROFILE = os.getenv("TRACKER_PROFILE", "balanced")
+
+_ENV_OVERRIDES = {
+    "INFERENCE_WIDTH": ("input_width", int),
+    "INFERENCE_THREADS": ("threads", int),
+    "MODEL_COMPLEXITY": ("model_complexity", int),
+    "REFINE_LANDMARKS": ("refine_landmarks", lambda v: v == "1"),
+    "MIN_DETECTION_CONF": ("min_detection_confidence", float),
+    "MIN_FACE_DETECTION_CONF": ("face_min_detection_confidence", float),
+    "MIN_TRACKING_CONF": ("min_tracking_confidence", float),
+}
+
+
+def get_profile(name=None, env=True):
+    """Copy of profile `name` (default TRACKER_PROFILE) with env overrides applied"""
+    name = (name or TRACKER_PROFILE).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown tracker profile '{name}' (expected one of {', '.join(PROFILES)})")
+    profile = dict(PROFILES[name], name=name)
+    if env:
+        for var, (key, conv) in _ENV_OVERRIDES.items():
+            if os.getenv(var):
+                profile[key] = conv(os.getenv(var))
+    return profile
+
+
+def apply_threads(profile, cpus=None):
+    """
+    Limit OpenCV threads to profile['threads'] (0 = leave alone) and pin to
+    `cpus` (default TRACKER_CPUS). Never picks cores itself: every tracker
+    choosing "the first n" would stack them all on the same cores.
+    """
+    import cv2
+    n = profile["threads"]
+    if n > 0:
+        cv2.setNumThreads(n)
+    cpus = os.getenv("TRACKER_CPUS", "") if cpus is None else cpus
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {int(c) for c in str(cpus).split(",") if c.strip()})
+
+
+def make_face_mesh(profile):
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=1,
+        refine_landmarks=profile["refine_landmarks"],
+        min_detection_confidence=profile["face_min_detection_confidence"],
+        min_tracking_confidence=profile["min_tracking_confidence"],
+    )
+
+
+def make_hands(profile):
+    import mediapipe as mp
+    return mp.solutions.hands.Hands(
+        max_num_hands=1,
+        model_complexity=profile["model_complexity"],
+        min_detection_confidence=profile["min_detection_confidence"],
+        min_tracking_confidence=profile["min_tracking_confidence"],
+    )
+
+
+def inference_input(rgb, profile):
+    """Downscale `rgb` to the profile's input width; landmarks are normalized so callers need no rescaling"""
+    import cv2
+    w = profile["input_width"]
+    h0, w0 = rgb.shape[:2]
+    if w <= 0 or w >= w0:
+        return rgb
+    return cv2.resize(rgb, (w, round(h0 * w / w0)), interpolation=cv2.INTER_AREA)
+
+
+def face_pointer_index(profile):
+    """Landmark the eye tracker points with: iris (476) if refined, else nose tip (1)"""
+    from landmark_stream import NOSE_TIP, POINTER_INDEX
+    return POINTER_INDEX["eye"] if profile["refine_landmarks"] else NOSE_TIP
+
+
+# ====== Corpus recording / benchmark matrix ======
+def record_clip(out_path, seconds, cam_index=0):
+    import cv2
+    cap = cv2.VideoCapture(cam_index)
+    if not cap.isOpened():
+        print("ERROR: Could not open camera.", file=sys.stderr)
+        return 1
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    writer = None
+    end = time.time() + seconds
+    try:
+        while time.time() < end:
+            ok, frame = cap.read()
+            if not ok:
+                continue
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+            writer.write(frame)
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+    print(f"Recorded {out_path}")
+    return 0
+
+
+def bench_profile(mode, profile, clips):
+    """Run one profile over every clip; returns fps, detection rate and landmark jitter"""
+    import cv2
+    model = make_face_mesh(profile) if mode == "eye" else make_hands(profile)
+    pointer = face_pointer_index(profile) if mode == "eye" else 8
+    frames = detected = 0
+    infer_s = 0.0
+    steps = []
+    for clip in clips:
+        cap = cv2.VideoCapture(clip)
+        prev = None
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            rgb = cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2RGB)
+            t0 = time.perf_counter()
+            out = model.process(inference_input(rgb, profile))
+            infer_s += time.perf_counter() - t0
+            frames += 1
+            found = out.multi_face_landmarks if mode == "eye" else out.multi_hand_landmarks
+            if found:
+                detected += 1
+                p = found[0].landmark[pointer]
+                if prev is not None:
+                    steps.append(((p.x - prev[0]) ** 2 + (p.y - prev[1]) ** 2) ** 0.5)
+                prev = (p.x, p.y)
+            else:
+                prev = None
+        cap.release()
+    model.close()
+    steps.sort()
+    return {
+        "frames": frames,
+        "fps": round(frames / infer_s, 1) if infer_s else 0.0,
+        "detect_rate": round(detected / frames, 3) if frames else 0.0,
+        # Median per-frame pointer motion (normalized x1000): low = steady landmarks
+        "jitter_median": round(steps[len(steps) // 2] * 1000, 2) if steps else None,
+    }
+
+
+def bench_matrix(mode, clips, names=None):
+    # Thread pinning is left out: affinity can't be widened again within one process
+    results = {}
+    for name in names or PROFILES:
+        profile = get_profile(name, env=False)
+        results[name] = dict(bench_profile(mode, profile, clips), profile=profile)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracker performance profiles")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="Record a camera clip for the replay corpus")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--seconds", type=float, default=20.0)
+    rec.add_argument("--cam", type=int, default=int(os.getenv("CAM_INDEX", "0")))
+
+    bench = sub.add_parser("bench", help="FPS / stability of every profile on recorded clips")
+    bench.add_argument("--mode", choices=["eye", "hand"], required=True)
+    bench.add_argument("--profiles", nargs="*", choices=list(PROFILES))
+    bench.add_argument("--json", help="Also write results to this file")
+    bench.add_argument("clips", nargs="+")
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        return record_clip(args.out, args.seconds, args.cam)
+
+    results = bench_matrix(args.mode, args.clips, args.profiles)
+    print(f"{'profile':<10} {'fps':>7} {'detect':>7} {'jitter':>7}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['fps']:>7} {r['detect_rate']:>7} {r['jitter_median']!s:>7}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mode": args.mode, "clips": args.clips, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
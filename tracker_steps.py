@@ -0,0 +1,182 @@
+"""
+Per-frame work the trackers do after inference, shared by Eye_Mouse.py,
+Hand_Mouse.py and perf_suite.py's replay benchmark: landmarks -> cursor
+target -> filter -> actuator, gesture engine -> actions, and the motion the
+frame governor runs on. Needs no camera, OpenCV or MediaPipe.
+
+    step = EyeStep(actuator, make_filter("one_euro"), GestureEngine(EYE_FEATURES, eye_gestures()))
+    pts, motion = step(face.landmark if face else None, frame_t)   # pts is None with nothing in view
+
+`clock` is what capture->move latency is measured against (the frame time
+source); replays pass their stream time. `replay_stream()` runs a recorded or
+synthetic landmark stream through a step headless, on a RecordingBackend.
+"""
+
+import time
+
+import numpy as np
+
+from cursor_actuator import CursorActuator, RecordingBackend
+from cursor_filter import LatencyMeter, make_filter
+from gaze_calibration import GAZE_LANDMARKS, gaze_features
+from landmark_features import (EYE_TRACKER_LANDMARKS, INDEX_TIP, LandmarkArray, eyelid_gap, finger_extension,
+                               pinch_distance, step_size)
+from gesture_engine import EYE_FEATURES, HAND_FEATURES, GestureEngine, eye_gestures, hand_gestures
+from landmark_stream import FACE_LANDMARKS, HAND_LANDMARKS, stream_pointer
+
+
+class _TrackerStep:
+    def __init__(self, actuator, cursor_filter, gestures, landmarks, clock):
+        self.actuator = actuator
+        self.cursor_filter = cursor_filter
+        self.gestures = gestures
+        self.landmarks = landmarks
+        self.clock = clock
+        self.latency = LatencyMeter()
+        self.screen_w, self.screen_h = actuator.size()
+        self.cursor = None     # filtered cursor position after the last frame with landmarks
+        self.events = []       # gesture events of the last frame
+        self._row = np.zeros(len(gestures.history.names))
+        # Governor activity features [pointer x, pointer y, eyelid gap / pinch distance]
+        self._feat = np.zeros(3, dtype=np.float32)
+        self._last_feat = np.zeros(3, dtype=np.float32)
+        self._have_last_feat = False
+
+    def _move(self, target_x, target_y, frame_t):
+        cur_x, cur_y = self.cursor_filter(target_x, target_y, frame_t)
+        self.actuator.move_to(cur_x, cur_y)
+        self.cursor = (cur_x, cur_y)
+        # Predict ahead by the measured capture->move latency (+ avg actuation delay)
+        self.cursor_filter.set_lookahead(
+            self.latency.update(self.clock() - frame_t + self.actuator.min_interval / 2))
+        return cur_x, cur_y
+
+    def _motion(self, x, y, value):
+        self._feat[:] = (x, y, value)
+        motion = step_size(self._feat, self._last_feat) if self._have_last_feat else 1.0
+        self._last_feat[:] = self._feat
+        self._have_last_feat = True
+        return motion
+
+    def lost(self):
+        self.events = []
+        self.gestures.clear_history()
+        self._have_last_feat = False
+        return None, 0.0
+
+
+class EyeStep(_TrackerStep):
+    """Gaze (raw `pointer` landmark or `gaze_mapper`) -> cursor; blink / dwell / edge scroll -> actions"""
+
+    def __init__(self, actuator, cursor_filter, gestures, pointer=476, gaze_mapper=None, scroll_speed=80,
+                 clock=time.perf_counter):
+        super().__init__(actuator, cursor_filter, gestures,
+                         LandmarkArray(FACE_LANDMARKS, EYE_TRACKER_LANDMARKS + GAZE_LANDMARKS + (pointer,)), clock)
+        self.pointer = pointer
+        self.gaze_mapper = gaze_mapper
+        self._gaze_feat = np.zeros(len(gaze_mapper.features)) if gaze_mapper else None
+        self.actions = {
+            "double_blink": lambda ev: actuator.double_click(),
+            "blink": lambda ev: actuator.click(),
+            "dwell": lambda ev: actuator.click(),
+            "edge_up": lambda ev: actuator.scroll(scroll_speed),
+            "edge_down": lambda ev: actuator.scroll(-scroll_speed),
+        }
+
+    def __call__(self, landmarks, frame_t):
+        """Handle one frame's face landmarks (None = no face); returns (pts or None, governor motion)"""
+        if landmarks is None:
+            return self.lost()
+        pts = self.landmarks.update(landmarks)
+        if self.gaze_mapper:
+            gaze_x, gaze_y = self.gaze_mapper(gaze_features(pts, self._gaze_feat))
+        else:
+            gaze_x, gaze_y = pts[self.pointer, :2].tolist()
+        cur_x, cur_y = self._move(gaze_x * self.screen_w, gaze_y * self.screen_h, frame_t)
+
+        eye_gap = eyelid_gap(pts)
+        self._row[:] = (eye_gap, cur_x, cur_y, gaze_y)
+        self.events = self.gestures.update(frame_t, self._row)
+        for ev in self.events:
+            self.actions[ev.name](ev)
+        return pts, self._motion(pts[self.pointer, 0], pts[self.pointer, 1], eye_gap)
+
+
+class HandStep(_TrackerStep):
+    """Index fingertip -> cursor; pinch click / hold right-click / pinch scroll / spread drag -> actions"""
+
+    def __init__(self, actuator, cursor_filter, gestures, scroll_gain=1200.0, clock=time.perf_counter):
+        super().__init__(actuator, cursor_filter, gestures, LandmarkArray(HAND_LANDMARKS), clock)
+        self.scroll_gain = scroll_gain
+        self._screen_wh = np.array([self.screen_w, self.screen_h], dtype=np.float32)
+        self.actions = {
+            ("drag", "start"): lambda ev: actuator.mouse_down(),
+            ("drag", "end"): lambda ev: actuator.mouse_up(),
+            ("click", "end"): lambda ev: actuator.click(),
+            ("right_click", "end"): lambda ev: actuator.click(button="right"),
+            ("scroll", "repeat"): self.pinch_scroll,
+        }
+
+    def pinch_scroll(self, ev):
+        dy = ev.delta  # cursor pixels since the last sample
+        if abs(dy) > 2:
+            scroll_amount = int(-(dy / self.screen_h) * self.scroll_gain)
+            if scroll_amount != 0:
+                self.actuator.scroll(scroll_amount)
+
+    def __call__(self, landmarks, frame_t):
+        """Handle one frame's hand landmarks (None = no hand); returns (pts or None, governor motion)"""
+        if landmarks is None:
+            return self.lost()
+        pts = self.landmarks.update(landmarks)
+        target_x, target_y = (pts[INDEX_TIP, :2] * self._screen_wh).tolist()
+        cur_x, cur_y = self._move(target_x, target_y, frame_t)
+
+        pinch_d = pinch_distance(pts)
+        # Finger extension relative to wrist (y-axis); pinch and drag state live in the gesture engine
+        # (In image coords, y grows down, so "extended upward" means lower y than wrist by threshold)
+        self._row[0] = pinch_d
+        self._row[1:3] = finger_extension(pts)
+        self._row[3] = cur_y
+        self.events = self.gestures.update(frame_t, self._row)
+        for ev in self.events:
+            self.actions[(ev.name, ev.phase)](ev)
+        return pts, self._motion(pts[INDEX_TIP, 0], pts[INDEX_TIP, 1], pinch_d)
+
+
+# ====== Replay ======
+def replay_stream(frames, kind, screen=(1920, 1080), cursor_filter="one_euro", gestures=None, gaze_mapper=None,
+                  pointer=None, on_frame=None):
+    """
+    Run [(t, landmarks or None)] through the `kind` tracker's step on stream
+    time, with a RecordingBackend instead of the OS. `gestures` is a gesture
+    table or GestureEngine (default the tracker's table); `on_frame(t, step,
+    pts)` runs after every frame. Returns (events, calls): the gesture events
+    and the backend's (t, action, args) calls.
+    """
+    now = [frames[0][0] if frames else 0.0]
+
+    def clock():
+        return now[0]
+
+    backend = RecordingBackend(screen, clock=clock)
+    actuator = CursorActuator(backend, threaded=False, clock=clock)
+    features, table = (EYE_FEATURES, eye_gestures) if kind == "eye" else (HAND_FEATURES, hand_gestures)
+    if not isinstance(gestures, GestureEngine):
+        gestures = GestureEngine(features, gestures if gestures is not None else table())
+    filt = make_filter(cursor_filter)
+    if kind == "eye":
+        pointer = stream_pointer(kind, frames) if pointer is None else pointer
+        step = EyeStep(actuator, filt, gestures, pointer=pointer, gaze_mapper=gaze_mapper, clock=clock)
+    else:
+        step = HandStep(actuator, filt, gestures, clock=clock)
+
+    events = []
+    for t, lm in frames:
+        now[0] = t
+        pts, _ = step(lm, t)
+        events += step.events
+        if on_frame is not None:
+            on_frame(t, step, pts)
+    actuator.stop()
+    return events, backend.events